@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of getting the api-key out of medusa's jwt.
+
+Compares the path the addon used before, jwt.decode(token, verify=False), with jwt.decode_unverified_claims(token).
+The token is the one the medusa stand-in hands out.
+
+Usage: python benchmarks/jwt_decode.py [--number 20000] [--repeat 5]
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+import warnings
+
+from run import setup_path
+
+setup_path()
+
+import jwt  # noqa: E402
+from medusa import API_KEY, make_token  # noqa: E402
+
+
+def decode(token):
+    return jwt.decode(token, '', algorithms=['HS256'], verify=False)
+
+
+def decode_unverified_claims(token):
+    return jwt.decode_unverified_claims(token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000, help='Decodes per measurement.')
+    parser.add_argument('--repeat', type=int, default=5, help='Measurements, the fastest is reported.')
+    args = parser.parse_args()
+
+    token = make_token(API_KEY)
+    # Like in kodi, the deprecation warning of verify=False isn't shown.
+    warnings.simplefilter('ignore', DeprecationWarning)
+    assert decode(token)['apiKey'] == decode_unverified_claims(token)['apiKey'] == API_KEY
+
+    results = {}
+    for func in (decode, decode_unverified_claims):
+        best = min(timeit.repeat(lambda: func(token), number=args.number, repeat=args.repeat))
+        results[func.__name__] = best / args.number * 1e6
+        print('{0:<26} {1:8.2f} us per token'.format(func.__name__, results[func.__name__]))
+    print('speedup: {0:.1f}x'.format(results['decode'] / results['decode_unverified_claims']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of signing and verifying short HS256/384/512 tokens.
+
+Compares hmac.new per token, like jwt did before, with an HMACSigner, which keys the HMAC state once and copies it
+per token. Reports tokens per second for HMACAlgorithm.sign alone, and for a jwt.encode + jwt.decode round trip with
+the prepared key cache disabled and enabled (the signers are kept in that cache).
+
+Usage: python benchmarks/jwt_hmac.py [--number 20000] [--repeat 5]
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+from run import setup_path
+
+setup_path()
+
+import jwt  # noqa: E402
+from jwt.algorithms import get_default_algorithms  # noqa: E402
+from medusa import API_KEY  # noqa: E402
+
+SECRET = 'medusa-benchmark-secret'
+PAYLOAD = {'apiKey': API_KEY}
+
+
+def measure(func, number, repeat):
+    """Return the tokens per second of the fastest measurement."""
+    return number / min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000, help='Tokens per measurement.')
+    parser.add_argument('--repeat', type=int, default=5, help='Measurements, the fastest is reported.')
+    args = parser.parse_args()
+
+    algorithms = get_default_algorithms()
+    uncached = jwt.PyJWT(key_cache_size=0)
+    cached = jwt.PyJWT()
+
+    for alg_id in ('HS256', 'HS384', 'HS512'):
+        alg = algorithms[alg_id]
+        key = alg.prepare_key(SECRET)
+        signer = alg.prepare_signing_key(SECRET)
+        token = jwt.encode(PAYLOAD, SECRET, algorithm=alg_id)
+        signing_input = token.rsplit(b'.', 1)[0]
+        assert alg.sign(signing_input, key) == alg.sign(signing_input, signer)
+
+        def round_trip(pyjwt):
+            return lambda: pyjwt.decode(pyjwt.encode(PAYLOAD, SECRET, algorithm=alg_id), SECRET, algorithms=[alg_id])
+
+        results = [
+            ('sign', measure(lambda: alg.sign(signing_input, key), args.number, args.repeat),
+             measure(lambda: alg.sign(signing_input, signer), args.number, args.repeat)),
+            ('encode + decode', measure(round_trip(uncached), args.number, args.repeat),
+             measure(round_trip(cached), args.number, args.repeat)),
+        ]
+        for name, before, after in results:
+            print('{0} {1:<16} {2:10.0f} -> {3:10.0f} tokens/s ({4:.2f}x)'.format(
+                alg_id, name, before, after, after / before
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+A local stand-in for Medusa, implementing the endpoints the addon uses with a configurable latency.
+
+Run it on its own with `python benchmarks/medusa.py --port 8081`, or use `MedusaStandIn` from the benchmarks.
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+API_KEY = 'b3nchm4rk4p1k3y'
+SESSION_COOKIE = 'medusa_user'
+# Series with a tvdb id at or above this aren't known to the stand-in, like shows medusa doesn't track.
+UNKNOWN_TVDB_ID = 1000000
+# The stand-in's series all use tvdb as their indexer, tmdb ids are only listed as an external id.
+TMDB_OFFSET = 500000
+
+# Latency in ms per endpoint, the key 'default' applies to the endpoints not listed.
+DEFAULT_LATENCY = {
+    'default': 5,
+    'authenticate': 300,
+    'login': 150,
+    'series': 40,
+    'retryEpisode': 60,
+}
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).replace(b'=', b'')
+
+
+def make_token(api_key, lifetime=86400):
+    """Build a HS256 jwt like medusa's, without depending on the vendored jwt package."""
+    now = int(time.time())
+    header = _b64(json.dumps({'typ': 'JWT', 'alg': 'HS256'}).encode('utf-8'))
+    payload = _b64(json.dumps({
+        'iss': 'Medusa stand-in', 'iat': now, 'exp': now + lifetime, 'username': 'medusa', 'apiKey': api_key
+    }).encode('utf-8'))
+    signing_input = header + b'.' + payload
+    signature = _b64(hmac.new(b'secret', signing_input, hashlib.sha256).digest())
+    return (signing_input + b'.' + signature).decode('ascii')
+
+
+def series_document(tvdb_id):
+    return {
+        'id': {'tvdb': tvdb_id, 'imdb': 'tt{0:07d}'.format(tvdb_id), 'slug': 'tvdb{0}'.format(tvdb_id)},
+        'externals': {'tmdb': TMDB_OFFSET + tvdb_id},
+        'indexer': 'tvdb',
+        'title': 'Show {0}'.format(tvdb_id),
+        'status': 'Continuing',
+        'config': {'location': '/tv/Show {0}'.format(tvdb_id), 'paused': False, 'qualities': {}},
+        'seasons': [],
+    }
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Buffer the response, so the headers and body go out together. Otherwise Nagle's algorithm and delayed acks
+    # add ~40 ms to some requests.
+    wbufsize = -1
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def stand_in(self):
+        return self.server.stand_in
+
+    def _endpoint(self):
+        path = urlparse(self.path).path.strip('/')
+        if path == 'api/v2/authenticate':
+            return 'authenticate'
+        if path.startswith('api/v2/series'):
+            return 'series'
+        return path.split('/')[-1]
+
+    def _send(self, status, body=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        endpoint = self._endpoint()
+        self.stand_in.count(endpoint)
+        time.sleep(self.stand_in.latency(endpoint))
+
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        query = dict((key, values[0]) for key, values in parse_qs(urlparse(self.path).query).items())
+
+        handler = getattr(self, '{0}_{1}'.format(method, endpoint), None)
+        if handler is None:
+            return self._send(404, {'error': 'Not found'})
+        return handler(body, query)
+
+    def do_GET(self):
+        self._handle('get')
+
+    def do_POST(self):
+        self._handle('post')
+
+    def _authorized_api(self):
+        return self.headers.get('X-Api-Key') == API_KEY
+
+    def _logged_in(self):
+        return '{0}='.format(SESSION_COOKIE) in (self.headers.get('Cookie') or '')
+
+    def post_authenticate(self, body, query):
+        self._send(200, {'token': make_token(API_KEY)})
+
+    def post_login(self, body, query):
+        self._send(302, headers={
+            'Location': '/home/', 'Set-Cookie': '{0}=session; Path=/'.format(SESSION_COOKIE)
+        })
+
+    def get_series(self, body, query):
+        if not self._authorized_api():
+            return self._send(401, {'error': 'No authorization token.'})
+
+        path = urlparse(self.path).path.strip('/')
+        if path == 'api/v2/series':
+            return self._send(200, self.stand_in.series_page(query))
+
+        # Like medusa, series are only found by the slug of their own indexer.
+        indexer, tvdb_id = re.match(r'.*/([a-z]+)(\d+)$', path).groups()
+        tvdb_id = int(tvdb_id)
+        if indexer != 'tvdb' or tvdb_id >= UNKNOWN_TVDB_ID or not self.stand_in.owns(tvdb_id):
+            return self._send(404, {'error': 'Series not found'})
+
+        etag = '"{0}"'.format(hashlib.sha1(str(tvdb_id).encode('ascii')).hexdigest())
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, headers={'ETag': etag})
+        self._send(200, series_document(tvdb_id), headers={'ETag': etag})
+
+    def _web(self, body):
+        if not self._logged_in():
+            return self._send(302, headers={'Location': '/login/?next=' + self.path})
+        self._send(200, body)
+
+    def _search(self, query):
+        if self._logged_in():
+            self.stand_in.searched(query)
+        self._web({'result': 'success'})
+
+    def get_retryEpisode(self, body, query):
+        self._search(query)
+
+    def get_searchEpisode(self, body, query):
+        self._search(query)
+
+    def get_getManualSearchStatus(self, body, query):
+        # Like medusa's search queue, only episodes that were searched for are listed.
+        self._web({'episodes': [{
+            'show': int(query.get('seriesid', 0)), 'season': int(query.get('season', 0)),
+            'episode': int(query.get('episode', 0)), 'searchstatus': 'Finished', 'status': 'Snatched',
+        }] if self.stand_in.was_searched(query) else []})
+
+
+class MedusaStandIn(object):
+    """Run the stand-in on a background thread, and count the requests per endpoint."""
+
+    def __init__(self, port=0, latency=None, shows=200, owns=None):
+        self.latencies = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.shows = shows
+        # Which tvdb ids this instance has, to stand in for one of several medusa instances. All of them by default.
+        self.owns = owns or (lambda tvdb_id: True)
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.searches = set()
+        self.server = _Server(('127.0.0.1', port), _Handler)
+        self.server.stand_in = self
+        self.thread = threading.Thread(target=self.server.serve_forever, name='medusa-stand-in')
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{0}/'.format(self.server.server_address[1])
+
+    def latency(self, endpoint):
+        return self.latencies.get(endpoint, self.latencies['default']) / 1000.0
+
+    def count(self, endpoint):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    @staticmethod
+    def _episode(query):
+        return query.get('indexername'), query.get('seriesid'), query.get('season'), query.get('episode')
+
+    def searched(self, query):
+        with self.lock:
+            self.searches.add(MedusaStandIn._episode(query))
+
+    def was_searched(self, query):
+        with self.lock:
+            return MedusaStandIn._episode(query) in self.searches
+
+    def series_page(self, query):
+        limit = int(query.get('limit', 20))
+        page = int(query.get('page', 1))
+        owned = [tvdb_id for tvdb_id in range(70000, 70000 + self.shows) if self.owns(tvdb_id)]
+        return [series_document(tvdb_id) for tvdb_id in owned[(page - 1) * limit:page * limit]]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def parse_latency(values):
+    """Parse ['authenticate=400', 'default=10'] into a latency dict."""
+    latency = {}
+    for value in values or []:
+        endpoint, _, ms = value.partition('=')
+        latency[endpoint] = float(ms)
+    return latency
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', action='append', help='endpoint=ms, for example authenticate=400')
+    args = parser.parse_args()
+
+    stand_in = MedusaStandIn(args.port, parse_latency(args.latency))
+    print('Medusa stand-in listening on {0}'.format(stand_in.url))
+    stand_in.server.serve_forever()
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmark of a context menu click, outside of Kodi.
+
+The Kodi modules are replaced by the stubs in benchmarks/stubs (with a synthetic library behind executeJSONRPC), and
+Medusa by the stand-in from benchmarks/medusa.py. Four scenarios are measured:
+
+- cold: a new process with an empty addon profile, like the very first click.
+- cold-cached: a new process, reusing the addon profile (tokens, cookies, caches) of the earlier clicks.
+  This is a click without the background service.
+- warm: clicks handled by one long lived MedusaFailed, like the background service does.
+- warm-indexed: warm clicks, with the series index built.
+
+Usage: python benchmarks/run.py [--runs 20] [--latency authenticate=400] [--rpc-latency 20]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+
+
+def setup_path():
+    for path in (os.path.join(BENCHMARKS, 'stubs'), ROOT, os.path.join(ROOT, 'resources', 'lib')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+class PhaseTimer(object):
+    """Collect the phases of the clicks' metrics records, and count the json-rpc calls made meanwhile."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.calls = 0
+
+    def add(self, record):
+        with self.lock:
+            for phase, duration in record.phases.items():
+                self.phases[phase] = self.phases.get(phase, 0) + duration
+
+    def call(self):
+        with self.lock:
+            self.calls += 1
+
+    def reset(self):
+        """Return the phases and the number of json-rpc calls since the last reset."""
+        with self.lock:
+            phases, self.phases = self.phases, {}
+            calls, self.calls = self.calls, 0
+        return phases, calls
+
+
+def instrument():
+    """
+    Import the addon, and collect the phases of MedusaFailed.run from its metrics spans.
+
+    The spans cover all the work of a click, also the json-rpc calls done outside of the resolver.
+    """
+    timer = PhaseTimer()
+    import library
+    from resources.lib import context, metrics
+
+    finish = metrics.Record.finish
+    execute = library.execute
+
+    def finished(record):
+        timer.add(record)
+        return finish(record)
+
+    def executed(method, params):
+        timer.call()
+        return execute(method, params)
+
+    metrics.Record.finish = finished
+    library.execute = executed
+    return context, timer
+
+
+def random_item():
+    import library
+
+    tvshow_db_id = random.randrange(library.SHOWS)
+    season = random.randint(1, library.SEASONS)
+    episode = random.randint(1, library.EPISODES)
+    return {
+        'mediatype': 'episode',
+        'dbid': library.episode_db_id(tvshow_db_id, season, episode),
+        'title': 'Show {0}'.format(tvshow_db_id),
+        'season': season,
+        'episode': episode,
+        'tvshow_dbid': None,
+        'show_ids': None,
+    }
+
+
+def click(failed, item):
+    """Handle one click, and wait for the search to be submitted."""
+    task = failed.run(item)
+    if task is not None:
+        task.join()
+
+
+def child():
+    """Handle a single click in this (new) process, and print the timings as json."""
+    start = time.time()
+    setup_path()
+    import xbmcaddon
+
+    context, timer = instrument()
+    imported = time.time()
+
+    failed = context.MedusaFailed(context.MySettings.from_addon(xbmcaddon.Addon()))
+    click(failed, random_item())
+    end = time.time()
+
+    phases, calls = timer.reset()
+    phases['import'] = imported - start
+    print(json.dumps({'total': end - start, 'phases': phases, 'jsonrpc': calls}))
+
+
+def run_child(env):
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child'], env=env)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile."""
+    values = sorted(values)
+    index = max(0, int(round(percent / 100.0 * len(values) + 0.5)) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def report(name, results):
+    totals = [result['total'] * 1000 for result in results]
+    print('\n{name}: {runs} runs, p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms'.format(
+        name=name, runs=len(results), p50=percentile(totals, 50), p95=percentile(totals, 95),
+        p99=percentile(totals, 99)
+    ))
+    calls = sum(result['jsonrpc'] for result in results)
+    print('  json-rpc calls   {0} in total, {1:.2f} per click'.format(calls, calls / float(len(results))))
+    phases = sorted(set(phase for result in results for phase in result['phases']))
+    for phase in phases:
+        durations = [result['phases'].get(phase, 0) * 1000 for result in results]
+        print('  {phase:<16} p50 {p50:>8.1f} ms  p95 {p95:>8.1f} ms  mean {mean:>8.1f} ms'.format(
+            phase=phase, p50=percentile(durations, 50), p95=percentile(durations, 95),
+            mean=sum(durations) / len(durations)
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--latency', action='append', help='medusa latency per endpoint, as endpoint=ms')
+    parser.add_argument('--rpc-latency', type=float, default=20, help='latency of a json-rpc call in ms')
+    parser.add_argument('--shows', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.child:
+        return child()
+
+    sys.path.insert(0, BENCHMARKS)
+    from medusa import MedusaStandIn, parse_latency
+
+    stand_in = MedusaStandIn(latency=parse_latency(args.latency), shows=args.shows).start()
+    profile = tempfile.mkdtemp(prefix='medusa-bench-')
+    os.environ.update({
+        'BENCH_MEDUSA_URL': stand_in.url,
+        'BENCH_PROFILE': profile,
+        'BENCH_RPC_LATENCY': str(args.rpc_latency),
+        'BENCH_SHOWS': str(args.shows),
+    })
+    random.seed(1)
+
+    try:
+        cold = []
+        for _ in range(args.runs):
+            shutil.rmtree(profile, ignore_errors=True)
+            cold.append(run_child(dict(os.environ)))
+        report('cold', cold)
+
+        report('cold-cached', [run_child(dict(os.environ)) for _ in range(args.runs)])
+
+        setup_path()
+        import xbmcaddon
+
+        context, timer = instrument()
+        failed = context.MedusaFailed(context.MySettings.from_addon(xbmcaddon.Addon()))
+        click(failed, random_item())
+        timer.reset()
+
+        warm = []
+        for _ in range(args.runs):
+            start = time.time()
+            click(failed, random_item())
+            total = time.time() - start
+            phases, calls = timer.reset()
+            warm.append({'total': total, 'phases': phases, 'jsonrpc': calls})
+        report('warm', warm)
+
+        # Like the service does after starting and after library scans.
+        failed.refresh_index()
+        timer.reset()
+        indexed = []
+        for _ in range(args.runs):
+            start = time.time()
+            click(failed, random_item())
+            total = time.time() - start
+            phases, calls = timer.reset()
+            indexed.append({'total': total, 'phases': phases, 'jsonrpc': calls})
+        report('warm-indexed', indexed)
+
+        print('\nmedusa requests: {0}'.format(json.dumps(stand_in.requests, sort_keys=True)))
+    finally:
+        stand_in.stop()
+        shutil.rmtree(profile, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""A synthetic Kodi video library, answering the json-rpc methods the addon uses."""
+
+import os
+import time
+
+SHOWS = int(os.environ.get('BENCH_SHOWS', 200))
+SEASONS = int(os.environ.get('BENCH_SEASONS', 3))
+EPISODES = int(os.environ.get('BENCH_EPISODES', 10))
+# Simulated latency of a json-rpc call in ms, for example for a library backed by MySQL.
+RPC_LATENCY = float(os.environ.get('BENCH_RPC_LATENCY', 20)) / 1000
+TVDB_OFFSET = 70000
+# Every third show is scraped from tmdb, so only has a tmdb id. Medusa knows the tvdb and tmdb ids of every show.
+TMDB_OFFSET = 500000
+
+
+def tvdb_id(tvshow_db_id):
+    return TVDB_OFFSET + tvshow_db_id
+
+
+def episode_db_id(tvshow_db_id, season, episode):
+    return (tvshow_db_id * SEASONS + season - 1) * EPISODES + episode
+
+
+def episode_details(episode_db_id):
+    index = episode_db_id - 1
+    return {
+        'episodeid': episode_db_id,
+        'tvshowid': index // (SEASONS * EPISODES),
+        'season': index // EPISODES % SEASONS + 1,
+        'episode': index % EPISODES + 1,
+    }
+
+
+def unique_ids(tvshow_db_id):
+    if tvshow_db_id % 3 == 2:
+        return {'tmdb': str(TMDB_OFFSET + tvdb_id(tvshow_db_id))}
+    return {'tvdb': str(tvdb_id(tvshow_db_id))}
+
+
+def tvshows():
+    return [{
+        'tvshowid': tvshow_db_id,
+        'label': 'Show {0}'.format(tvshow_db_id),
+        'title': 'Show {0}'.format(tvshow_db_id),
+        'imdbnumber': list(unique_ids(tvshow_db_id).values())[0],
+        'uniqueid': unique_ids(tvshow_db_id),
+    } for tvshow_db_id in range(SHOWS)]
+
+
+def execute(method, params):
+    time.sleep(RPC_LATENCY)
+    if method == 'VideoLibrary.GetEpisodeDetails':
+        return {'episodedetails': episode_details(params['episodeid'])}
+    if method == 'VideoLibrary.GetTVShowDetails':
+        return {'tvshowdetails': tvshows()[params['tvshowid']]}
+    if method == 'VideoLibrary.GetSeasonDetails':
+        seasonid = params['seasonid']
+        return {'seasondetails': {'seasonid': seasonid, 'tvshowid': seasonid // SEASONS,
+                                  'season': seasonid % SEASONS + 1}}
+    if method == 'VideoLibrary.GetEpisodes':
+        seasons = [params['season']] if 'season' in params else range(1, SEASONS + 1)
+        return {'episodes': [
+            episode_details(episode_db_id(params['tvshowid'], season, episode))
+            for season in seasons for episode in range(1, EPISODES + 1)
+        ]}
+    if method == 'VideoLibrary.GetTVShows':
+        shows = tvshows()
+        limits = params.get('limits', {})
+        start, end = limits.get('start', 0), limits.get('end', len(shows))
+        return {'tvshows': shows[start:end], 'limits': {'start': start, 'end': min(end, len(shows)),
+                                                         'total': len(shows)}}
+    raise KeyError(method)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Stub of Kodi's xbmc module, for running the addon outside of Kodi."""
+
+import json
+import os
+import sys
+import time
+
+import library
+
+LOGDEBUG, LOGINFO, LOGNOTICE, LOGWARNING, LOGERROR, LOGFATAL = 0, 1, 2, 3, 4, 6
+LOG_LEVEL = int(os.environ.get('BENCH_LOG_LEVEL', LOGWARNING))
+
+
+def log(msg, level=LOGDEBUG):
+    if level >= LOG_LEVEL:
+        sys.stderr.write('[xbmc] {0}\n'.format(msg))
+
+
+def translatePath(path):
+    return path
+
+
+def getInfoLabel(label):
+    return ''
+
+
+def sleep(ms):
+    time.sleep(ms / 1000.0)
+
+
+def executeJSONRPC(request):
+    request = json.loads(request)
+    try:
+        response = {'jsonrpc': '2.0', 'id': request['id'], 'result': library.execute(request['method'],
+                                                                                      request['params'])}
+    except (KeyError, IndexError) as error:
+        response = {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32602, 'message': str(error)}}
+    return json.dumps(response).encode('utf-8')
+
+
+class Monitor(object):
+    """Abort right away, so the addon doesn't keep polling after the benchmark's click."""
+
+    def abortRequested(self):
+        return True
+
+    def waitForAbort(self, timeout=0):
+        return True
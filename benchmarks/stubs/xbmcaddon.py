@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""Stub of Kodi's xbmcaddon module. The settings come from BENCH_* environment variables."""
+
+import os
+
+
+class Addon(object):
+
+    def __init__(self, id=None):
+        self.settings = {
+            'medusaurl': os.environ.get('BENCH_MEDUSA_URL', ''),
+            'medusaurl_2': os.environ.get('BENCH_MEDUSA_URL_2', ''),
+            'username': 'medusa',
+            'password': 'medusa',
+            'debug': 'false',
+            'batch_workers': '4',
+            'dedup_window': os.environ.get('BENCH_DEDUP_WINDOW', '10'),
+        }
+
+    def getAddonInfo(self, key):
+        return {
+            'id': 'context.medusa.failed',
+            'name': 'Medusa failed download search',
+            'path': os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            'profile': os.environ.get('BENCH_PROFILE', '/tmp/medusa-bench-profile'),
+        }[key]
+
+    def getSetting(self, key):
+        return self.settings.get(key, '')
+
+    def setSetting(self, key, value):
+        self.settings[key] = value
+
+    def getLocalizedString(self, string_id):
+        return str(string_id)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Stub of Kodi's xbmcgui module. Dialogs never block, and confirm every question."""
+
+NOTIFICATION_INFO = 'info'
+NOTIFICATION_WARNING = 'warning'
+NOTIFICATION_ERROR = 'error'
+
+_properties = {}
+
+
+class Dialog(object):
+
+    def notification(self, heading, message, icon=NOTIFICATION_INFO, time=5000, sound=True):
+        pass
+
+    def ok(self, heading, line1, *args):
+        return True
+
+    def yesno(self, heading, line1, *args, **kwargs):
+        return True
+
+    def textviewer(self, heading, text):
+        pass
+
+
+class DialogProgressBG(object):
+
+    def create(self, heading, message=''):
+        pass
+
+    def update(self, percent=0, heading=None, message=None):
+        pass
+
+    def isFinished(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class Window(object):
+    """All windows share the properties, which is good enough for the home window the addon uses."""
+
+    def __init__(self, window_id=-1):
+        pass
+
+    def getProperty(self, key):
+        return _properties.get(key, '')
+
+    def setProperty(self, key, value):
+        _properties[key] = value
+
+    def clearProperty(self, key):
+        _properties.pop(key, None)
@@ -1,29 +1,26 @@
 # -*- coding: utf-8 -*-
 import xbmcaddon
 import os, sys
+import time
 import xbmc
 
 __addon__ = xbmcaddon.Addon('context.medusa.failed')
 __cwd__ = xbmc.translatePath(__addon__.getAddonInfo('path')).decode('utf-8')
-__resource__ = xbmc.translatePath(os.path.join(__cwd__, 'resources', 'lib'))
-__settings__ = xbmcaddon.Addon('context.medusa.failed')
+__settings__ = __addon__
 __language__ = __settings__.getLocalizedString
 
 sys.path.append(os.path.join(__cwd__, 'resources', 'lib'))
 xbmc.log('Addon dir: ' + __cwd__, xbmc.LOGINFO)
 
-from resources.lib import context
-
-
-class MySettings(object):
-    def __init__(self, url, username, password, debug):
-        self.url = url + '/' if not url[-1] == '/' else url
-        self.username = username
-        self.password = password
-        self.debug = debug
+debug = bool(__settings__.getSetting('debug').lower() == 'true')
+if debug:
+    # Report how long the imports of this click took.
+    from resources.lib.timing import ImportTimer
+    import_timer = ImportTimer()
+    import_timer.install()
 
+from resources.lib import ipc
 
-debug = bool(__settings__.getSetting('debug').lower() == 'true')
 remote = False
 if debug:
     try:
@@ -39,15 +36,25 @@ if debug:
             pydevd.settrace('localhost', port=51234, stdoutToServer=True, stderrToServer=True)
 
 # Keep this file to a minimum, as Kodi
-# doesn't keep a compiled copy of this
-ADDON = xbmcaddon.Addon()
-
-context = context.MedusaFailed(
-    MySettings(
-        __settings__.getSetting('medusaurl'),
-        __settings__.getSetting('username'),
-        __settings__.getSetting('password'),
-        __settings__.getSetting('debug')
-    )
-)
-context.run()
+# doesn't keep a compiled copy of this. Requests and jwt are only imported when they are needed.
+start = time.time()
+
+if len(sys.argv) > 1 and sys.argv[1] == 'metrics':
+    # Started from the settings, show the timings of the last clicks.
+    import xbmcgui
+    from resources.lib import metrics
+    xbmcgui.Dialog().textviewer(__addon__.getAddonInfo('name'), metrics.summary())
+else:
+    item = ipc.list_item_info(sys.listitem)
+    if ipc.send_request(item):
+        xbmc.log('Handed click to the medusa service in {0:.0f} ms'.format((time.time() - start) * 1000),
+                 xbmc.LOGDEBUG)
+    else:
+        # The service isn't running, handle the click ourselves.
+        from resources.lib import context
+        context.MedusaFailed(context.MySettings.from_addon(__settings__)).run(item)
+        xbmc.log('Handled click without the medusa service in {0:.0f} ms'.format((time.time() - start) * 1000),
+                 xbmc.LOGDEBUG)
+
+if debug:
+    import_timer.report()
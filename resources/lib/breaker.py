@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+A circuit breaker for the requests to medusa, so clicks fail fast while medusa is down or too slow to answer.
+
+Every request to medusa asks the breaker first, see `MedusaApi._send`. Once FAILURE_THRESHOLD requests in a row found
+medusa unreachable (see `transport.unreachable`), the circuit opens: requests fail right away with a
+`CircuitOpenError`, instead of each waiting for its timeouts and retries. RESET_TIMEOUT seconds later the circuit is
+half-open, and a single request is let through to find out whether medusa is back. The service sends that probe in
+the background, without it the next click does. Its success closes the circuit, a failure opens it again.
+
+The state is kept per medusa url in a json file in the addon's profile, so it's shared by the service and the clicks
+handled without it, and survives restarts.
+"""
+
+import threading
+import time
+
+import xbmc
+
+from resources.lib.cache import cache_key, profile_path, store
+
+BREAKER_FILE = 'breaker.json'
+# Requests in a row that found medusa unreachable, before the circuit opens.
+FAILURE_THRESHOLD = 3
+# Seconds the circuit stays open, before a request is let through to probe medusa.
+RESET_TIMEOUT = 30
+# (connect, read) timeout of the probe, a request for medusa's root url.
+PROBE_TIMEOUT = (3.05, 10)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+_breakers = {}
+_lock = threading.Lock()
+_error_class = None
+
+
+def get(url, path=None):
+    """Return the breaker for medusa's url. All MedusaApi instances in the process share it."""
+    with _lock:
+        if url not in _breakers:
+            _breakers[url] = CircuitBreaker(store(path or profile_path(BREAKER_FILE)), url)
+        return _breakers[url]
+
+
+def open_error(url, retry_in):
+    """
+    Return the error for a request that wasn't sent, because the circuit is open.
+
+    The error is a requests ConnectionError, so it's handled like any other unreachable medusa. The class is created
+    on first use, as requests is only imported once a request is made.
+    """
+    global _error_class
+    if _error_class is None:
+        from requests.exceptions import ConnectionError
+
+        class CircuitOpenError(ConnectionError):
+            """Medusa failed too many requests in a row, the request wasn't sent."""
+
+        _error_class = CircuitOpenError
+    return _error_class('Medusa at {0} is not responding, trying again in {1:.0f} seconds'.format(url, retry_in))
+
+
+def is_open_error(error):
+    return _error_class is not None and isinstance(error, _error_class)
+
+
+class CircuitBreaker(object):
+    """The breaker of one medusa url. See the module's docstring."""
+
+    def __init__(self, store, url, threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.store = store
+        self.url = url
+        self.key = cache_key(url)
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+
+    def _entry(self):
+        # Reloaded when another invocation changed the file, a stat call when it didn't.
+        return self.store.reload().get(self.key) or {'state': CLOSED, 'failures': 0}
+
+    def state(self):
+        return self._entry()['state']
+
+    def retry_in(self, entry=None):
+        """Return the seconds until a request is let through again, 0 when one is let through now."""
+        entry = entry or self._entry()
+        if entry['state'] == CLOSED:
+            return 0
+        since = entry['probing'] if entry['state'] == HALF_OPEN else entry['opened']
+        # A probe that didn't report back within the reset timeout (its invocation died) is replaced.
+        return max(0, since + self.reset_timeout - time.time())
+
+    def is_open(self):
+        return self.retry_in() > 0
+
+    def allow(self):
+        """Whether a request may be sent. Lets a single request through as the probe, once the circuit is due."""
+        with self.store.lock:
+            entry = self._entry()
+            if entry['state'] == CLOSED:
+                return True
+            if self.retry_in(entry):
+                return False
+            entry = dict(entry, state=HALF_OPEN, probing=time.time())
+            self.store.set(self.key, entry)
+        xbmc.log('Checking whether medusa at {0} is back'.format(self.url), xbmc.LOGDEBUG)
+        return True
+
+    def record_success(self):
+        with self.store.lock:
+            entry = self._entry()
+            if entry['state'] == CLOSED and not entry['failures']:
+                return
+            self.store.set(self.key, {'state': CLOSED, 'failures': 0})
+        if entry['state'] != CLOSED:
+            xbmc.log('Medusa at {0} is back, closed the circuit'.format(self.url), xbmc.LOGINFO)
+
+    def record_failure(self):
+        with self.store.lock:
+            entry = self._entry()
+            failures = entry['failures'] + 1
+            if entry['state'] == CLOSED and failures < self.threshold:
+                self.store.set(self.key, dict(entry, failures=failures))
+                return
+            self.store.set(self.key, {'state': OPEN, 'failures': failures, 'opened': time.time()})
+        xbmc.log('Medusa at {url} failed {failures} requests in a row, failing requests for {seconds} seconds'.format(
+            url=self.url, failures=failures, seconds=self.reset_timeout
+        ), xbmc.LOGWARNING)
@@ -0,0 +1,669 @@
+# -*- coding: utf-8 -*-
+"""Small persistent caches, stored in the addon's profile directory."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import xbmc
+import xbmcaddon
+
+ADDON_ID = 'context.medusa.failed'
+
+# Reuse a cached token until it's this close (in seconds) to its expiry.
+TOKEN_EXPIRY_MARGIN = 60
+# Start a background refresh once less than this fraction of the token's lifetime is left.
+TOKEN_REFRESH_FRACTION = 0.1
+# Lifetime used for tokens that don't carry an exp claim.
+TOKEN_DEFAULT_TTL = 3600
+# Seconds a series lookup is used without asking medusa again.
+SERIES_CACHE_TTL = 6 * 3600
+# Seconds we remember that medusa doesn't know a series.
+SERIES_NEGATIVE_TTL = 10 * 60
+# Number of episode and show mappings kept in the library cache.
+LIBRARY_CACHE_SIZE = 5000
+# Library mappings are dropped after this many seconds, in case we missed kodi's notifications.
+LIBRARY_CACHE_TTL = 7 * 24 * 3600
+# Seconds a show in the series index is used, before it's looked up in medusa again.
+SERIES_INDEX_TTL = 24 * 3600
+# Bytes of the library database sqlite may memory map, enough for the index of a large library.
+SERIES_INDEX_MMAP_SIZE = 16 * 1024 * 1024
+
+
+_profile = None
+
+
+def profile_path(*parts):
+    """Return a path inside the addon's profile directory, creating the directory if needed."""
+    global _profile
+    if _profile is None:
+        profile = xbmc.translatePath(xbmcaddon.Addon(ADDON_ID).getAddonInfo('profile'))
+        if isinstance(profile, bytes):
+            profile = profile.decode('utf-8')
+
+        if not os.path.isdir(profile):
+            try:
+                os.makedirs(profile)
+            except OSError:
+                # Created by a concurrent invocation.
+                pass
+        _profile = profile
+
+    return os.path.join(_profile, *parts)
+
+
+def cache_key(*parts):
+    """Build a stable, filesystem and json friendly key from the parts provided."""
+    raw = u'\0'.join(u'{0}'.format(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def replace(src, dst):
+    """Rename src over dst. Python 2 doesn't have os.replace, but os.rename overwrites on POSIX too."""
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    elif os.name != 'nt':
+        os.rename(src, dst)
+    else:
+        # os.rename can't overwrite on Windows. Readers may briefly miss the file here.
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        os.rename(src, dst)
+
+
+def atomic_write(path, content, sync=False):
+    """
+    Write content to path through a temporary file in the same directory, which is renamed over path.
+
+    Readers see either the old or the new file, and a crash never leaves a half written one. Every call uses its own
+    temporary file, so concurrent writers don't trip over each other; the last rename wins.
+
+    :param sync: fsync the file before it's renamed, for files that must survive a power loss.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory or None)
+    try:
+        with os.fdopen(fd, 'w') as fp:
+            fp.write(content)
+            if sync:
+                fp.flush()
+                os.fsync(fp.fileno())
+        replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonStore(object):
+    """A dict persisted as a json file. Written through `atomic_write`, so a crash never leaves a half written file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self._data = None
+        self._mtime = None
+
+    def _modified(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def load(self):
+        with self.lock:
+            if self._data is None:
+                self._mtime = self._modified()
+                try:
+                    with open(self.path, 'r') as fp:
+                        self._data = json.load(fp)
+                except (IOError, OSError, ValueError):
+                    self._data = {}
+            return self._data
+
+    def reload(self):
+        """Drop the data in memory when another invocation wrote the file since it was loaded."""
+        with self.lock:
+            if self._data is not None and self._modified() != self._mtime:
+                self._data = None
+            return self.load()
+
+    def save(self):
+        with self.lock:
+            atomic_write(self.path, json.dumps(self.load()))
+            self._mtime = self._modified()
+
+    def get(self, key, default=None):
+        return self.load().get(key, default)
+
+    def set(self, key, value):
+        with self.lock:
+            self.load()[key] = value
+            self.save()
+
+    def delete(self, key):
+        with self.lock:
+            if self.load().pop(key, None) is not None:
+                self.save()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def store(path):
+    """
+    Return the JsonStore of a file. Everything in the process that uses the file shares the store.
+
+    A store writes its whole dict back, so two stores of the same file would drop each other's entries.
+    """
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = JsonStore(path)
+        return _stores[path]
+
+
+class TokenCache(object):
+    """
+    Cache of Medusa's jwt and api-key, keyed by url and username.
+
+    The entries are only reused while the jwt's exp claim is not yet near.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, url, username):
+        """Return the cached entry, or None when there is none or it's (almost) expired."""
+        entry = self.store.get(cache_key(url, username))
+        if not entry:
+            return None
+
+        if entry.get('exp', 0) - time.time() < TOKEN_EXPIRY_MARGIN:
+            return None
+
+        return entry
+
+    def set(self, url, username, token, api_key, issued_at=None, expires_at=None):
+        now = time.time()
+        entry = {
+            'token': token,
+            'api_key': api_key,
+            'iat': issued_at or now,
+            'exp': expires_at or now + TOKEN_DEFAULT_TTL,
+        }
+        self.store.set(cache_key(url, username), entry)
+        return entry
+
+    def invalidate(self, url, username):
+        self.store.delete(cache_key(url, username))
+
+    @staticmethod
+    def needs_refresh(entry):
+        """Return True when the entry is still usable, but should be refreshed soon."""
+        lifetime = entry['exp'] - entry['iat']
+        return entry['exp'] - time.time() < max(lifetime * TOKEN_REFRESH_FRACTION, TOKEN_EXPIRY_MARGIN * 2)
+
+
+class CookieCache(object):
+    """
+    Medusa's web-login cookies, keyed by url and username, so a web session survives between invocations.
+
+    Also keeps track of how many logins were needed, and how many were avoided by reusing the cookies.
+    """
+
+    STATS_KEY = 'stats'
+
+    def __init__(self, store):
+        self.store = store
+
+    def load(self, url, username, jar):
+        """Copy the persisted cookies into the cookie jar. Returns True when there were any."""
+        cookies = self.store.get(cache_key(url, username)) or []
+        now = time.time()
+        restored = False
+        for cookie in cookies:
+            if cookie.get('expires') and cookie['expires'] < now:
+                continue
+            jar.set(
+                cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path'),
+                expires=cookie.get('expires'), secure=cookie.get('secure', False)
+            )
+            restored = True
+        return restored
+
+    @staticmethod
+    def dump(jar):
+        """Return the cookies of the jar, as they're persisted."""
+        return [{
+            'name': cookie.name,
+            'value': cookie.value,
+            'domain': cookie.domain,
+            'path': cookie.path,
+            'expires': cookie.expires,
+            'secure': cookie.secure,
+        } for cookie in jar]
+
+    def save(self, url, username, jar):
+        self.store.set(cache_key(url, username), self.dump(jar))
+
+    def invalidate(self, url, username):
+        self.store.delete(cache_key(url, username))
+
+    def count(self, counter):
+        """Increment one of the login counters. Returns the updated stats."""
+        with self.store.lock:
+            stats = self.store.get(self.STATS_KEY) or {'logins': 0, 'logins_avoided': 0}
+            stats[counter] = stats.get(counter, 0) + 1
+            self.store.set(self.STATS_KEY, stats)
+        return stats
+
+
+class SeriesCache(object):
+    """
+    Medusa's series lookups, keyed by url and series slug (for example tvdb81189).
+
+    Only the fields the addon uses are stored. Series that medusa doesn't know about are remembered for a short
+    while (negative entries). Stale entries keep their ETag and Last-Modified validators, so they can be revalidated
+    with a conditional request.
+    """
+
+    def __init__(self, store, ttl=SERIES_CACHE_TTL, negative_ttl=SERIES_NEGATIVE_TTL):
+        self.store = store
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    @staticmethod
+    def trim(series):
+        """
+        Keep only the fields of medusa's series document that the addon uses.
+
+        The whole `id` dict is kept, as the ids of all indexers are used to match kodi's shows, and `indexer` tells
+        which of them medusa identifies the series by. `medusa` is the url of the instance owning the series, when
+        the series was tagged with it.
+        """
+        trimmed = {
+            'id': dict((name, value) for name, value in (series.get('id') or {}).items() if value),
+            'externals': dict((name, value) for name, value in (series.get('externals') or {}).items() if value),
+            'indexer': series.get('indexer') or 'tvdb',
+            'title': series.get('title'),
+        }
+        if series.get('medusa'):
+            trimmed['medusa'] = series['medusa']
+        return trimmed
+
+    def get(self, url, slug):
+        return self.store.get(cache_key(url, slug))
+
+    def is_fresh(self, entry):
+        ttl = self.ttl if entry.get('series') else self.negative_ttl
+        return time.time() - entry.get('fetched', 0) < ttl
+
+    @staticmethod
+    def validators(entry):
+        """Return the headers for a conditional request, revalidating the entry."""
+        headers = {}
+        if entry and entry.get('series'):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def set(self, url, slug, series, etag=None, last_modified=None):
+        entry = {
+            'series': SeriesCache.trim(series) if series else None,
+            'fetched': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+        }
+        self.store.set(cache_key(url, slug), entry)
+        return entry
+
+    def touch(self, url, slug, entry):
+        """Mark a revalidated entry as fresh again."""
+        entry['fetched'] = time.time()
+        self.store.set(cache_key(url, slug), entry)
+        return entry
+
+
+class OwnerCache(object):
+    """
+    Which medusa instance owns a series, keyed by the series slug (for example tvdb81189).
+
+    Only used with more than one instance configured, so a series is looked up in its owner instead of all of them.
+    """
+
+    def __init__(self, store, ttl=SERIES_INDEX_TTL):
+        self.store = store
+        self.ttl = ttl
+
+    def get(self, slug):
+        """Return the url of the instance owning the series, or None when it's unknown or expired."""
+        entry = self.store.get(slug)
+        if not entry or time.time() - entry.get('checked', 0) > self.ttl:
+            return None
+        return entry['url']
+
+    def set(self, slug, url):
+        self.store.set(slug, {'url': url, 'checked': time.time()})
+
+    def invalidate(self, slug):
+        self.store.delete(slug)
+
+
+class LibraryCache(object):
+    """
+    Memoize kodi's episode dbid -> show dbid -> unique ids lookups in a sqlite database.
+
+    The least recently used mappings are evicted, once there are more than `size` of them. Mappings are invalidated
+    by kodi's library notifications (see `on_notification`), and otherwise expire after `ttl` seconds.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS episodes '
+        '(episode_dbid INTEGER PRIMARY KEY, tvshow_dbid INTEGER, created REAL, accessed REAL)',
+        'CREATE TABLE IF NOT EXISTS tvshow_ids '
+        '(tvshow_dbid INTEGER PRIMARY KEY, unique_ids TEXT, created REAL, accessed REAL)',
+        'CREATE INDEX IF NOT EXISTS episodes_tvshow ON episodes (tvshow_dbid)',
+    )
+
+    def __init__(self, path, size=LIBRARY_CACHE_SIZE, ttl=LIBRARY_CACHE_TTL):
+        self.path = path
+        self.size = size
+        self.ttl = ttl
+        with self.connect() as connection:
+            for statement in LibraryCache.SCHEMA:
+                connection.execute(statement)
+
+    def connect(self):
+        # A connection per operation, as it's used from the service's threads and concurrent invocations.
+        return _Connection(sqlite3.connect(self.path, timeout=5))
+
+    def _get(self, table, column, key_column, key):
+        now = time.time()
+        with self.connect() as connection:
+            row = connection.execute(
+                'SELECT {0} FROM {1} WHERE {2} = ? AND created > ?'.format(column, table, key_column),
+                (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE {0} SET accessed = ? WHERE {1} = ?'.format(table, key_column), (now, key))
+            return row[0]
+
+    def _set(self, table, items):
+        now = time.time()
+        with self.connect() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO {0} VALUES (?, ?, ?, ?)'.format(table),
+                [(key, value, now, now) for key, value in items]
+            )
+            # Evict the least recently used mappings.
+            connection.execute(
+                'DELETE FROM {0} WHERE rowid IN '
+                '(SELECT rowid FROM {0} ORDER BY accessed DESC LIMIT -1 OFFSET ?)'.format(table), (self.size,)
+            )
+
+    def get_tvshow_db_id(self, episode_db_id):
+        return self._get('episodes', 'tvshow_dbid', 'episode_dbid', int(episode_db_id))
+
+    def set_tvshow_db_id(self, episode_db_id, tvshow_db_id):
+        self._set('episodes', [(int(episode_db_id), int(tvshow_db_id))])
+
+    def set_tvshow_episodes(self, tvshow_db_id, episode_db_ids):
+        """Map all of a show's episodes to the show, in one transaction."""
+        self._set('episodes', [(int(episode_db_id), int(tvshow_db_id)) for episode_db_id in episode_db_ids])
+
+    def get_unique_ids(self, tvshow_db_id):
+        unique_ids = self._get('tvshow_ids', 'unique_ids', 'tvshow_dbid', int(tvshow_db_id))
+        return json.loads(unique_ids) if unique_ids else None
+
+    def set_unique_ids(self, tvshow_db_id, unique_ids):
+        self._set('tvshow_ids', [(int(tvshow_db_id), json.dumps(unique_ids, sort_keys=True))])
+
+    def remove_episode(self, episode_db_id):
+        with self.connect() as connection:
+            connection.execute('DELETE FROM episodes WHERE episode_dbid = ?', (int(episode_db_id),))
+
+    def remove_tvshow(self, tvshow_db_id):
+        with self.connect() as connection:
+            connection.execute('DELETE FROM tvshow_ids WHERE tvshow_dbid = ?', (int(tvshow_db_id),))
+            connection.execute('DELETE FROM episodes WHERE tvshow_dbid = ?', (int(tvshow_db_id),))
+
+    def clear(self):
+        with self.connect() as connection:
+            connection.execute('DELETE FROM tvshow_ids')
+            connection.execute('DELETE FROM episodes')
+
+    def on_notification(self, method, data):
+        """
+        Invalidate the mappings affected by one of kodi's library notifications.
+
+        Episode updates (like a changed playcount) don't change the mappings, so only removals, show updates
+        (a show can be refreshed with another scraper) and library cleans invalidate anything.
+        """
+        if method == 'VideoLibrary.OnCleanFinished':
+            self.clear()
+            return
+
+        if method not in ('VideoLibrary.OnRemove', 'VideoLibrary.OnUpdate'):
+            return
+
+        library_item = _notification_item(data)
+        if library_item is None:
+            return
+
+        if library_item.get('type') == 'tvshow':
+            self.remove_tvshow(library_item['id'])
+        elif library_item.get('type') == 'episode' and method == 'VideoLibrary.OnRemove':
+            self.remove_episode(library_item['id'])
+
+
+class SeriesIndex(object):
+    """
+    Lookup table of kodi's show dbid -> medusa's series, built in bulk by `index.refresh`.
+
+    It's stored next to the library cache, and sqlite memory maps the database, so a lookup only reads the pages it
+    needs. Shows medusa doesn't know are stored without a series, and are looked up again after `negative_ttl`.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS tvshow_series '
+        '(tvshow_dbid INTEGER PRIMARY KEY, unique_ids TEXT, series TEXT, indexed REAL)',
+    )
+
+    def __init__(self, path, ttl=SERIES_INDEX_TTL, negative_ttl=SERIES_NEGATIVE_TTL, mmap_size=SERIES_INDEX_MMAP_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.mmap_size = mmap_size
+        with self.connect() as connection:
+            for statement in SeriesIndex.SCHEMA:
+                connection.execute(statement)
+
+    def connect(self):
+        return _mapped_connection(self.path, self.mmap_size)
+
+    def is_fresh(self, entry):
+        ttl = self.ttl if entry['series'] else self.negative_ttl
+        return time.time() - entry['indexed'] < ttl
+
+    def get(self, tvshow_db_id):
+        """Return the series of the show, trimmed like `SeriesCache.trim`. None when it's not indexed (anymore)."""
+        with self.connect() as connection:
+            row = connection.execute(
+                'SELECT series FROM tvshow_series WHERE tvshow_dbid = ? AND series IS NOT NULL AND indexed > ?',
+                (int(tvshow_db_id), time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def entries(self):
+        """Return all entries, as a dict of show dbid -> entry."""
+        with self.connect() as connection:
+            rows = connection.execute('SELECT tvshow_dbid, unique_ids, series, indexed FROM tvshow_series').fetchall()
+        return dict(
+            (row[0], {'unique_ids': json.loads(row[1]), 'series': row[2], 'indexed': row[3]}) for row in rows
+        )
+
+    def update(self, rows):
+        """Add or replace entries, from (show dbid, unique ids, series or None) tuples."""
+        now = time.time()
+        with self.connect() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO tvshow_series VALUES (?, ?, ?, ?)',
+                [(int(tvshow_db_id), json.dumps(unique_ids, sort_keys=True), json.dumps(series) if series else None,
+                  now) for tvshow_db_id, unique_ids, series in rows]
+            )
+
+    def remove(self, tvshow_db_ids):
+        with self.connect() as connection:
+            connection.executemany(
+                'DELETE FROM tvshow_series WHERE tvshow_dbid = ?',
+                [(int(tvshow_db_id),) for tvshow_db_id in tvshow_db_ids]
+            )
+
+    def clear(self):
+        with self.connect() as connection:
+            connection.execute('DELETE FROM tvshow_series')
+
+    def on_notification(self, method, data):
+        """Drop the shows that were removed or updated, the next refresh indexes them again."""
+        if method not in ('VideoLibrary.OnRemove', 'VideoLibrary.OnUpdate'):
+            return
+
+        library_item = _notification_item(data)
+        if library_item is not None and library_item.get('type') == 'tvshow':
+            self.remove([library_item['id']])
+
+
+class CrossIndex(object):
+    """
+    Lookup table of (indexer, id) -> medusa's series, for the ids of every indexer medusa knows for its series.
+
+    Kodi's shows can be scraped from tvdb, tmdb or tvmaze, while medusa identifies the series by the id of its own
+    indexer. This matches a show by any of its unique ids in one query, instead of trying medusa's api per indexer.
+    It's rebuilt from medusa's series listing by `index.refresh`, when it's older than `ttl`.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS series_ids '
+        '(indexer TEXT, indexer_id TEXT, series TEXT, indexed REAL, PRIMARY KEY (indexer, indexer_id))',
+    )
+
+    def __init__(self, path, ttl=SERIES_NEGATIVE_TTL, mmap_size=SERIES_INDEX_MMAP_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.mmap_size = mmap_size
+        with self.connect() as connection:
+            for statement in CrossIndex.SCHEMA:
+                connection.execute(statement)
+
+    def connect(self):
+        return _mapped_connection(self.path, self.mmap_size)
+
+    @staticmethod
+    def series_ids(series):
+        """Yield the (indexer, id) pairs of a trimmed series, from its `id` dict and its externals."""
+        for ids in (series['id'], series.get('externals') or {}):
+            for indexer, indexer_id in ids.items():
+                # Medusa names some externals like tvmaze_id.
+                indexer = indexer[:-3] if indexer.endswith('_id') else indexer
+                if indexer != 'slug':
+                    yield indexer, '{0}'.format(indexer_id)
+
+    def replace(self, all_series):
+        """Replace the table with the ids of all medusa's series. Returns the number of series."""
+        rows = {}
+        count = 0
+        for series in all_series:
+            count += 1
+            series = SeriesCache.trim(series)
+            encoded = json.dumps(series)
+            for key in CrossIndex.series_ids(series):
+                # Keep the first series claiming an id.
+                rows.setdefault(key, encoded)
+
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute('DELETE FROM series_ids')
+            connection.executemany(
+                'INSERT INTO series_ids VALUES (?, ?, ?, ?)',
+                [(indexer, indexer_id, encoded, now) for (indexer, indexer_id), encoded in rows.items()]
+            )
+        return count
+
+    def is_empty(self):
+        with self.connect() as connection:
+            return connection.execute('SELECT 1 FROM series_ids LIMIT 1').fetchone() is None
+
+    def age(self):
+        """Return the seconds since the table was built, None when it's empty."""
+        with self.connect() as connection:
+            indexed = connection.execute('SELECT MIN(indexed) FROM series_ids').fetchone()[0]
+        return time.time() - indexed if indexed is not None else None
+
+    def lookup_all(self, all_unique_ids):
+        """Return the series (or None) for every dict of unique ids, in one connection."""
+        results = []
+        with self.connect() as connection:
+            for unique_ids in all_unique_ids:
+                series = None
+                for indexer, indexer_id in sorted((unique_ids or {}).items()):
+                    row = connection.execute(
+                        'SELECT series FROM series_ids WHERE indexer = ? AND indexer_id = ?',
+                        (indexer, '{0}'.format(indexer_id))
+                    ).fetchone()
+                    if row:
+                        series = json.loads(row[0])
+                        break
+                results.append(series)
+        return results
+
+    def lookup(self, unique_ids):
+        """Return the series matching any of the show's unique ids, or None."""
+        return self.lookup_all([unique_ids])[0]
+
+
+def _mapped_connection(path, mmap_size):
+    connection = sqlite3.connect(path, timeout=5)
+    connection.execute('PRAGMA mmap_size = {0:d}'.format(mmap_size))
+    return _Connection(connection)
+
+
+def _notification_item(data):
+    """Return the library item of a VideoLibrary notification, or None when it doesn't have one."""
+    try:
+        data = json.loads(data)
+    except (TypeError, ValueError):
+        return None
+    # OnUpdate nests the item, OnRemove doesn't.
+    library_item = data.get('item', data)
+    if not library_item.get('id'):
+        return None
+    return library_item
+
+
+class _Connection(object):
+    """Commit and close a sqlite connection when leaving the with block."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.connection.commit()
+        finally:
+            self.connection.close()
@@ -3,20 +3,34 @@
 import xbmc
 import xbmcaddon
 import xbmcgui
-import requests
-from requests.compat import urljoin
-from requests.exceptions import HTTPError, RequestException
-from requests.auth import HTTPBasicAuth
-import json
 import os, sys
-import jwt
+import threading
+import time
+
+try:
+    from urllib.parse import urljoin
+except ImportError:
+    from urlparse import urljoin
+
+from resources.lib import breaker, endpoints, index, journal, limiter, metrics, transport
+from resources.lib.cache import (CookieCache, CrossIndex, LibraryCache, OwnerCache, SeriesCache, SeriesIndex,
+                                 TokenCache, profile_path, store)
+from resources.lib.inflight import InFlight
+from resources.lib.ipc import HOME_WINDOW_ID, list_item_info
+from resources.lib.pool import WorkerPool, first, spawn
+from resources.lib.resolver import SOURCE_INDEX, SOURCE_LISTITEM, SeriesResolver, json_rpc
 
 
 addon = xbmcaddon.Addon()
 addon_name = addon.getAddonInfo('name')
 dialog = xbmcgui.Dialog()
 
-TIMEOUT = 60
+# Medusa redirects to the login page, when the web session isn't valid (anymore).
+LOGIN_REQUIRED_STATUS = (301, 302, 303, 307, 401)
+# The indexers medusa can look a series up by (as its slug), in order of preference.
+SLUG_INDEXERS = ('tvdb', 'tmdb', 'tvmaze')
+# Numbers of the settings of the other medusa instances, like medusaurl_2.
+OTHER_INSTANCES = (2, 3)
 
 
 def dialog_notification(message, heading='Medusa failed downloads', icon=xbmcgui.NOTIFICATION_INFO):
@@ -27,35 +41,145 @@ def dialog_ok(line1, *args, **kwargs):
     dialog.ok(addon_name, line1)
 
 
+def wait(authenticated):
+    """
+    Wait for the authentication running alongside (a `pool.Future`, or None).
+
+    A failed authentication is only logged. The requests that follow fail in turn, and report it (or journal the
+    search) like any other failed request.
+    """
+    if authenticated is not None and authenticated.error() is not None:
+        xbmc.log('Failed authenticating against medusa: {0}'.format(authenticated.error()), xbmc.LOGWARNING)
+
+
+def series_params(show):
+    """Return the indexername and seriesid medusa's web routes identify the series by."""
+    indexer = show.get('indexer') or 'tvdb'
+    return {'indexername': indexer, 'seriesid': show['id'][indexer]}
+
+
+def series_slug(show):
+    """Return the series' slug, for example tvdb81189."""
+    return '{indexername}{seriesid}'.format(**series_params(show))
+
+
+class MySettings(object):
+    def __init__(self, url, username, password, debug, batch_workers=4, dedup_window=600,
+                 rate_limit=limiter.DEFAULT_RATE, rate_burst=limiter.DEFAULT_BURST, other_instances=()):
+        # Equivalent base urls of medusa, separated by commas. The first one identifies the instance, see endpoints.
+        self.urls = [part if part.endswith('/') else part + '/' for part in
+                     (part.strip() for part in url.split(',')) if part]
+        self.url = self.urls[0]
+        self.username = username
+        self.password = password
+        self.debug = debug
+        self.batch_workers = batch_workers
+        # Seconds in which repeated clicks on an episode follow the search that was already started.
+        self.dedup_window = dedup_window
+        # Requests per second to medusa's web routes and api v1, and the burst allowed on top. See the limiter module.
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+        # (url, username, password) of the other medusa instances. Empty credentials are the same as this one's.
+        self.other_instances = list(other_instances)
+
+    @classmethod
+    def from_addon(cls, settings):
+        other_instances = [
+            (settings.getSetting('medusaurl_{0}'.format(number)), settings.getSetting('username_{0}'.format(number)),
+             settings.getSetting('password_{0}'.format(number)))
+            for number in OTHER_INSTANCES if settings.getSetting('medusaurl_{0}'.format(number))
+        ]
+        return cls(
+            settings.getSetting('medusaurl'),
+            settings.getSetting('username'),
+            settings.getSetting('password'),
+            settings.getSetting('debug'),
+            int(settings.getSetting('batch_workers') or 4),
+            int(settings.getSetting('dedup_window') or 10) * 60,
+            int(settings.getSetting('rate_limit') or limiter.DEFAULT_RATE),
+            int(settings.getSetting('rate_burst') or limiter.DEFAULT_BURST),
+            other_instances
+        )
+
+    def instances(self):
+        """Return the settings of every medusa instance, this (the first) one first."""
+        return [self] + [
+            MySettings(url, username or self.username, password or self.password, self.debug, self.batch_workers,
+                       self.dedup_window, self.rate_limit, self.rate_burst)
+            for url, username, password in self.other_instances
+        ]
+
+
 class MedusaApi(object):
     """Class for communicating with Medusa's apiv1, apiv2 and webroutes."""
-    MEDUSA_SESSION = requests.Session()
-    MEDUSA_API_V2_SESSION = requests.Session()
-    MEDUSA_API_V1_SESSION = requests.Session()
+    # The sessions share one connection pool and retry policy, see the transport module. They're created (and
+    # requests is imported) on first use.
+    MEDUSA_SESSION = transport.LazySession()
+    MEDUSA_API_V2_SESSION = transport.LazySession()
+    MEDUSA_API_V1_SESSION = transport.LazySession()
+    # Batches run web requests in parallel, make sure only one of them logs in.
+    LOGIN_LOCK = threading.Lock()
 
     def __init__(self, settings):
         self.url = settings.url
+        self.endpoints = endpoints.get(settings.urls)
         self.username = settings.username
         self.password = settings.password
         self.dialog = xbmcgui.Dialog()
         self.api_key = ''
+        self.token_cache = TokenCache(store(profile_path('tokens.json')))
+        self.cookie_cache = CookieCache(store(profile_path('cookies.json')))
+        self.series_cache = SeriesCache(store(profile_path('series.json')))
+        # Whether the web session is known to be logged in, by a login or a request using the restored cookies.
+        self.logged_in = False
+        # The persisted cookies are only loaded once per instance. None until then.
+        self.saved_cookies = None
+        # Incremented by every login, so concurrent requests that found the session expired only login once.
+        self.logins = 0
+        self.breaker = breaker.get(self.url)
+        limiter.configure(settings.rate_limit, settings.rate_burst)
 
     def authenticate(self):
+        """
+        Get an api-key, from the token cache when possible. Otherwise authenticate against medusa.
+
+        A cached token which is close to its expiry is still used, but refreshed in the background.
+        """
+        with metrics.span('authenticate'):
+            cached = self.token_cache.get(self.url, self.username)
+            if not cached:
+                self._authenticate()
+                return
+
+            xbmc.log('Using cached api-key for {0}'.format(self.url), xbmc.LOGDEBUG)
+            self._set_api_key(cached['api_key'])
+
+        if TokenCache.needs_refresh(cached):
+            xbmc.log('Cached token for {0} is about to expire, refreshing it'.format(self.url), xbmc.LOGDEBUG)
+            refresh = threading.Thread(target=self._authenticate, name='medusa-token-refresh')
+            refresh.start()
+
+    def _authenticate(self):
         """
         Authenticate against /api/v2/authenticate and use the username/password to get the jwt token.
         The jwt token is decoded without verification to get the api-key
         """
+        from requests.exceptions import HTTPError
+
         response = None
         try:
             headers = {
                 'Content-Type': 'application/json'
             }
-            url = urljoin(self.url, 'api/v2/authenticate')
+            url = 'api/v2/authenticate'
             data = {
                 "username": self.username,
                 "password": self.password
             }
-            response = MedusaApi.MEDUSA_SESSION.post(url, json=data, headers=headers, verify=False, timeout=TIMEOUT)
+            response = self._send(
+                self.MEDUSA_SESSION, 'post', url, json=data, headers=headers, verify=False,
+                timeout=transport.timeout('api/v2/authenticate')
+            )
             response.raise_for_status()
         except HTTPError as error:
             xbmc.log(
@@ -69,43 +193,112 @@ class MedusaApi(object):
                     self.url, error
                 ), xbmc.LOGWARNING)
 
+        if not response:
+            return None
         try:
-            jwt_encoded = response.json() if response else response
-        except (AttributeError, ValueError):
+            jwt_encoded = response.json()
+        except ValueError:
             return None
 
         # Decode the jwt into the api-key
-        if jwt_encoded.get('token'):
-            decoded = jwt.decode(jwt_encoded['token'], '', algorithms=['HS256'], verify=False, timeout=TIMEOUT)
-            MedusaApi.MEDUSA_API_V2_SESSION.headers.update({
-                'X-Api-Key': decoded['apiKey']
-            })
-            self.api_key = decoded['apiKey']
+        if isinstance(jwt_encoded, dict) and jwt_encoded.get('token'):
+            # Imported here, as it's only needed when the cached token can't be used.
+            import jwt
+
+            decoded = jwt.decode_unverified_claims(jwt_encoded['token'])
+            self._set_api_key(decoded['apiKey'])
+            self.token_cache.set(
+                self.url, self.username, jwt_encoded['token'], decoded['apiKey'],
+                issued_at=decoded.get('iat'), expires_at=decoded.get('exp')
+            )
+
+    def _set_api_key(self, api_key):
+        self.MEDUSA_API_V2_SESSION.headers.update({
+            'X-Api-Key': api_key
+        })
+        self.api_key = api_key
+
+    def _reauthenticate(self):
+        """Drop the cached token, as medusa didn't accept it anymore, and get a new one."""
+        xbmc.log('Medusa rejected the api-key for {0}, authenticating again'.format(self.url), xbmc.LOGINFO)
+        self.token_cache.invalidate(self.url, self.username)
+        self.MEDUSA_API_V2_SESSION.headers.pop('X-Api-Key', None)
+        self.api_key = ''
+        self._authenticate()
+        return bool(self.api_key)
 
-    def get_series(self, tvdb_id=''):
+    def get_series(self, indexer_id, indexer='tvdb', notify=True):
         """
-        Use the apiv2 to get the series data with the tvdb_id provided.
+        Use the apiv2 to get the series data with the indexer's id provided.
+
+        The series are cached. Stale entries are revalidated with a conditional request, and series medusa doesn't
+        know about are remembered for a short while.
+
+        :param notify: Notify the user when the series can't be retrieved. Off when several instances are asked.
         """
+        def notification(message):
+            if notify:
+                dialog_notification(message, icon=xbmcgui.NOTIFICATION_WARNING)
+
+        slug = '{indexer}{indexer_id}'.format(indexer=indexer, indexer_id=indexer_id)
+        cached = self.series_cache.get(self.url, slug)
+        if cached and self.series_cache.is_fresh(cached):
+            xbmc.log('Using cached series for {0}'.format(slug), xbmc.LOGDEBUG)
+            if not cached['series']:
+                notification('Failed retrieving series with {indexer} id {indexer_id}'.format(
+                    indexer=indexer, indexer_id=indexer_id
+                ))
+            return cached['series']
+
+        from requests.exceptions import HTTPError, RequestException
+
         try:
-            response = self.api_v2_request('api/v2/series/tvdb{tvdb_id}'.format(tvdb_id=tvdb_id))
+            response = self.api_v2_request('api/v2/series/{slug}'.format(slug=slug),
+                                           headers=SeriesCache.validators(cached))
+            if response.status_code == 304:
+                xbmc.log('Cached series for {0} is still valid'.format(slug), xbmc.LOGDEBUG)
+                return self.series_cache.touch(self.url, slug, cached)['series']
+            if response.status_code == 404:
+                self.series_cache.set(self.url, slug, None)
             response.raise_for_status()
         except HTTPError as error:
-            dialog_notification(
-                'Failed retrieving series with tvdb id {tvdb_id}'.format(tvdb_id=tvdb_id), xbmcgui.NOTIFICATION_WARNING
-            )
+            notification('Failed retrieving series with {indexer} id {indexer_id}'.format(
+                indexer=indexer, indexer_id=indexer_id
+            ))
             xbmc.log('Failed retrieving series, error: {0}'.format(error), xbmc.LOGERROR)
         except RequestException as error:
-            dialog_notification(
-                'Something went wrong trying to connect to {url}. Error: {error}'.format(
-                    url=self.url, error=error
-                ),
-                xbmcgui.NOTIFICATION_WARNING
-            )
+            if breaker.is_open_error(error):
+                notification('{0}'.format(error))
+                return None
+            notification('Something went wrong trying to connect to {url}. Error: {error}'.format(
+                url=self.url, error=error
+            ))
             xbmc.log('Something went wrong trying to connect to {url}. Error: {error}'.format(
                 url=self.url, error=error
             ), xbmc.LOGERROR)
         else:
-            return response.json()
+            return self.series_cache.set(
+                self.url, slug, response.json(),
+                etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified')
+            )['series']
+
+    def iter_series(self, page_size=100):
+        """
+        Yield every series medusa has, fetching api/v2/series one page at a time.
+
+        Stops early when the caller does, so a lookup of a few shows doesn't read the whole listing.
+        """
+        page = 1
+        while True:
+            response = self.api_v2_request('api/v2/series', params={'limit': page_size, 'page': page})
+            response.raise_for_status()
+            series = response.json()
+            for show in series:
+                yield show
+
+            if len(series) < page_size:
+                return
+            page += 1
 
     def api_v1_request(self, params):
         """
@@ -113,140 +306,419 @@ class MedusaApi(object):
 
         Example of full request: http://localhost:8081/mywebroot/api/v1/[apikey]/?cmd=episode.search&indexerid=260449&season=1&episode=1&tvdbid=260449
         """
-        if not MedusaApi.MEDUSA_API_V2_SESSION.headers.get('X-Api-Key'):
+        if not self.MEDUSA_API_V2_SESSION.headers.get('X-Api-Key'):
             dialog_notification('Your not authenticated to medusas api v2!', xbmcgui.NOTIFICATION_WARNING)
 
-        url_with_api_key = urljoin(self.url, 'api/v1/{key}/'.format(key=self.api_key))
         headers = {
             'X-Requested-With': 'XMLHttpRequest'
         }
-        # Increased timeout as the forced search call is synchronous. So on large providers lists we need to wait a
-        # certain time, to get back results.
-        return MedusaApi.MEDUSA_API_V1_SESSION.get(
-            url_with_api_key, params=params, headers=headers, verify=False, timeout=600
-        )
 
-    def api_v2_request(self, url, params=None):
+        self._throttle()
+
+        def request():
+            url_with_api_key = 'api/v1/{key}/'.format(key=self.api_key)
+            return self._send(
+                self.MEDUSA_API_V1_SESSION, 'get', url_with_api_key, params=params, headers=headers, verify=False,
+                timeout=transport.timeout('api/v1')
+            )
+
+        response = request()
+        if response.status_code == 401 and self._reauthenticate():
+            response = request()
+        return response
+
+    def api_v2_request(self, url, params=None, headers=None):
         """Request a resource using medusa's api v2."""
-        if not MedusaApi.MEDUSA_API_V2_SESSION.headers.get('X-Api-Key'):
+        if not self.MEDUSA_API_V2_SESSION.headers.get('X-Api-Key'):
             dialog_notification('Your not authenticated to medusas api v2!', xbmcgui.NOTIFICATION_WARNING)
 
-        full_url = urljoin(self.url, url)
-        return MedusaApi.MEDUSA_API_V2_SESSION.get(full_url, params=params, verify=False, timeout=TIMEOUT)
+        def request():
+            return self._send(
+                self.MEDUSA_API_V2_SESSION, 'get', url, params=params, headers=headers, verify=False,
+                timeout=transport.timeout(url)
+            )
+
+        response = request()
+        if response.status_code == 401 and self._reauthenticate():
+            response = request()
+        return response
 
-    def web_request(self, url, params):
-        """Request a resource using medusa's web_request."""
+    def _send(self, session, method, path, **kwargs):
+        """
+        Send a request for a path relative to medusa's url, through the circuit breaker (see the breaker module).
+
+        While the circuit is open this raises a requests ConnectionError right away, without sending the request.
+        The request goes to the current endpoint. When it can't connect to it, it's sent to the next endpoint, see
+        the endpoints module.
+        """
+        from requests.exceptions import RequestException
 
-        # First login.
+        if not self.breaker.allow():
+            metrics.count('fast_failed')
+            raise breaker.open_error(self.url, self.breaker.retry_in())
+
+        base = self.endpoints.current()
+        while True:
+            try:
+                response = session.request(method, urljoin(base, path), **kwargs)
+                break
+            except RequestException as error:
+                base = self.endpoints.failover(base) if transport.connect_failed(error) else None
+                if base is not None:
+                    metrics.count('failovers')
+                    continue
+                self.endpoints.reset()
+                if transport.unreachable(error):
+                    self.breaker.record_failure()
+                raise
+
+        if response.status_code in transport.RETRY_STATUS:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def check_endpoints(self):
+        """Check the health and latency of medusa's endpoints, and use the fastest. See the endpoints module."""
+        return self.endpoints.check(self.MEDUSA_SESSION)
+
+    def probe(self):
+        """
+        Check whether medusa is back, when the circuit is due for it.
+
+        :return: True when the circuit is closed (again).
+        """
+        from requests.exceptions import RequestException
+
+        if self.breaker.state() == breaker.CLOSED:
+            return True
+        try:
+            self._send(self.MEDUSA_SESSION, 'get', '', verify=False, allow_redirects=False,
+                       timeout=breaker.PROBE_TIMEOUT)
+        except RequestException:
+            pass
+        return self.breaker.state() == breaker.CLOSED
+
+    @staticmethod
+    def _throttle():
+        """Wait for the rate limiter. The wait is recorded as the queue_wait phase of the click."""
+        with metrics.span('queue_wait'):
+            limiter.acquire()
+
+    def login(self):
+        """Login to medusa's web ui, and persist the session cookies for the next invocation."""
         login_data = {
             'username': self.username,
             'password': self.password,
             'remember_me': 1,
             'submit': 'Login'
         }
-        MedusaApi.MEDUSA_SESSION.post(
-            urljoin(self.url, 'login'), data=login_data, headers={'Content-Type': 'application/x-www-form-urlencoded'},
-            verify=False, auth=(self.username, self.password), timeout=TIMEOUT
-        )
+        with metrics.span('login'):
+            self._send(
+                self.MEDUSA_SESSION, 'post', 'login', data=login_data,
+                headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                verify=False, auth=(self.username, self.password), timeout=transport.timeout('login')
+            )
+        metrics.count('logins')
+        self.logins += 1
+        self.logged_in = True
+        self.save_cookies()
+        stats = self.cookie_cache.count('logins')
+        xbmc.log('Logged in to {url}. Logins: {logins}, avoided: {logins_avoided}'.format(
+            url=self.url, **stats
+        ), xbmc.LOGDEBUG)
+
+    def save_cookies(self):
+        """Persist the web session's cookies, when they changed since they were loaded or saved."""
+        cookies = CookieCache.dump(self.MEDUSA_SESSION.cookies)
+        if cookies != self.saved_cookies:
+            self.cookie_cache.save(self.url, self.username, self.MEDUSA_SESSION.cookies)
+            self.saved_cookies = cookies
+
+    def web_request(self, url, params):
+        """
+        Request a resource using medusa's web_request.
+
+        The web session cookies are reused from an earlier invocation when possible. We only login again, when
+        medusa redirects us to the login page or answers with a 401.
+        """
+        self._throttle()
+        with MedusaApi.LOGIN_LOCK:
+            if self.saved_cookies is None:
+                self.cookie_cache.load(self.url, self.username, self.MEDUSA_SESSION.cookies)
+                self.saved_cookies = CookieCache.dump(self.MEDUSA_SESSION.cookies)
+            if not self.logged_in and not self.saved_cookies:
+                self.login()
 
-        full_url = urljoin(self.url, url)
         xbmc.log('base url: {base}, added: {added}, full: {full}'.format(
-            base=self.url, added=url, full=full_url
+            base=self.endpoints.current(), added=url, full=urljoin(self.endpoints.current(), url)
         ), xbmc.LOGINFO)
 
         headers = {
             'Content-Type': 'application/json'
         }
-        return MedusaApi.MEDUSA_SESSION.get(
-            full_url, params=params, headers=headers, verify=False, auth=(self.username, self.password), timeout=TIMEOUT
-        )
+
+        def request():
+            return self._send(
+                self.MEDUSA_SESSION, 'get', url, params=params, headers=headers, verify=False,
+                auth=(self.username, self.password), timeout=transport.timeout(url), allow_redirects=False
+            )
+
+        logins = self.logins
+        response = request()
+        if response.status_code in LOGIN_REQUIRED_STATUS:
+            with MedusaApi.LOGIN_LOCK:
+                # Another request may have logged in again already, while this one waited for the lock.
+                if self.logins == logins:
+                    xbmc.log('Medusa web session for {0} expired, logging in again'.format(self.url), xbmc.LOGDEBUG)
+                    self.cookie_cache.invalidate(self.url, self.username)
+                    self.MEDUSA_SESSION.cookies.clear()
+                    self.saved_cookies = []
+                    self.login()
+            response = request()
+        else:
+            with MedusaApi.LOGIN_LOCK:
+                reused, self.logged_in = not self.logged_in, True
+            if reused:
+                # Counted once, for the first request that got through with the restored cookies.
+                metrics.count('logins_avoided')
+                stats = self.cookie_cache.count('logins_avoided')
+                xbmc.log('Reused medusa web session for {url}. Logins: {logins}, avoided: {logins_avoided}'.format(
+                    url=self.url, **stats
+                ), xbmc.LOGDEBUG)
+
+        self.save_cookies()
+        return response
 
 
 class MedusaFailed(object):
     def __init__(self, settings):
         self.settings = settings
-        self.addon = xbmcaddon.Addon()
+        self.addon = addon
         self.addon_name = self.addon.getAddonInfo('name')
-        self.medusa = MedusaApi(settings)
+        self.instances = [MedusaApi(instance) for instance in settings.instances()]
+        # The first instance. It owns the series no other instance claimed.
+        self.medusa = self.instances[0]
+        self.owners = OwnerCache(store(profile_path('owners.json')))
+        self.pool = WorkerPool(settings.batch_workers, name='medusa-batch')
+        self.resolver = SeriesResolver(LibraryCache(profile_path('library.db')))
+        self.index = SeriesIndex(profile_path('library.db'))
+        self.cross_index = CrossIndex(profile_path('library.db'))
+        self.cross_index_building = threading.Lock()
+        self.journal = journal.RetryJournal(profile_path(journal.JOURNAL_FILE))
+        self.inflight = InFlight(settings.dedup_window)
+
+    def authenticate(self):
+        """Authenticate against all medusa instances, the other instances in parallel with the first."""
+        futures = [spawn(metrics.bind(medusa.authenticate)) for medusa in self.instances[1:]]
         self.medusa.authenticate()
+        for future in futures:
+            future.wait()
 
-    def match_series(self, episode_db_id):
-        tvdb_id = None
+    def instance(self, url):
+        """Return the instance with the url, or None when it's not configured (anymore)."""
+        return next((medusa for medusa in self.instances if medusa.url == url), None)
 
-        # Get episode details
-        json_data = {
-            "jsonrpc": "2.0", "id": "1", "method": "VideoLibrary.GetEpisodeDetails",
-            "params": {
-                "episodeid": int(episode_db_id), "properties": ["tvshowid"]
-            }
-        }
-        response = xbmc.executeJSONRPC(json.dumps(json_data))
-        json_response = json.loads(response.decode('utf-8', 'replace'))
-
-        # Get show details
-        json_data = {
-            "jsonrpc": "2.0", "id": 1,
-            "method": "VideoLibrary.GetTVShowDetails",
-            "params": {"tvshowid": json_response['result']['episodedetails']['tvshowid'], "properties": ["imdbnumber"]}
-        }
-        response = xbmc.executeJSONRPC(json.dumps(json_data))
-        json_response = json.loads(response.decode('utf-8', 'replace'))
+    def owner(self, show):
+        """Return the instance owning the series. That's the one it was found in, or the first instance."""
+        return self.instance(show.get('medusa')) or self.medusa
+
+    def refresh_index(self):
+        """Bring the series index up to date, see `index.refresh`."""
+        return index.refresh(self.index, self.cross_index, self.instances)
+
+    def indexed_series(self, item):
+        """
+        Look the item's show up in the series index.
+
+        Only done when the show's dbid is known, or costs the same json-rpc call the resolver would do anyway.
+        Items which carry the show's unique ids, but not its dbid, go straight to `find_series`.
+        """
+        tvshow_db_id = item.get('tvshow_dbid')
+        if not tvshow_db_id and not item.get('show_ids'):
+            tvshow_db_id, _ = self.resolver.episode_tvshow_db_id(item['dbid'])
+        return self.index.get(tvshow_db_id) if tvshow_db_id is not None else None
+
+    def find_series(self, unique_ids, source, authenticated=None):
+        """
+        Find medusa's series by any of the show's unique ids.
+
+        The cross index matches the ids of all indexers locally. Only when it doesn't know the show, medusa is asked
+        for the series by the id of one indexer it can look series up by. When the cross index is still empty (no
+        service), it's built from medusa's listing in the background, and the click looks the series up by its tvdb
+        id. Most series are indexed by tvdb in medusa, which only finds a series by the id of its own indexer. Shows
+        without a tvdb id wait for the listing instead.
+
+        :param authenticated: The future of the authentication running alongside, waited for before medusa is asked.
+        """
+        building = None
+        with metrics.span('resolve'):
+            show = self.cross_index.lookup(unique_ids) if unique_ids else None
+            if not show and unique_ids and self.cross_index.is_empty():
+                if unique_ids.get('tvdb'):
+                    building = self.build_cross_index_later(authenticated)
+                else:
+                    wait(authenticated)
+                    show = self.build_cross_index(unique_ids)
+        if show:
+            source = '{0}+{1}'.format(source, SOURCE_INDEX)
+        metrics.set_info('resolve_source', source)
+        xbmc.log("Resolved ids {0} using {1}".format(unique_ids, source), xbmc.LOGDEBUG)
+        if show or not unique_ids:
+            return show
+
+        indexer = next((indexer for indexer in SLUG_INDEXERS if unique_ids.get(indexer)), None)
+        if indexer is None:
+            xbmc.log("None of the ids {0} can be looked up in medusa".format(unique_ids), xbmc.LOGDEBUG)
+            return None
+        wait(authenticated)
+        with metrics.span('get_series'):
+            show = self.get_series(unique_ids[indexer], indexer)
+        if not show and building is not None:
+            # Medusa may index the series by another indexer, which the listing does match.
+            with metrics.span('resolve'):
+                building.join()
+                show = self.cross_index.lookup(unique_ids)
+        return show
+
+    def get_series(self, indexer_id, indexer):
+        """
+        Get the series from the instance that owns it.
+
+        With more than one instance, the owner is looked up in the owner cache. When it's not known (or doesn't have
+        the series anymore), all instances are asked in parallel, and the first one that has the series is its owner.
+        The lookups run on their own threads, so they don't queue up behind a batch's searches in the pool.
+        """
+        if len(self.instances) == 1:
+            return self.medusa.get_series(indexer_id, indexer)
+
+        slug = '{indexer}{indexer_id}'.format(indexer=indexer, indexer_id=indexer_id)
+        owner = self.instance(self.owners.get(slug))
+        show = owner.get_series(indexer_id, indexer, notify=False) if owner else None
+        if not show:
+            futures = [spawn(metrics.bind(medusa.get_series), indexer_id, indexer, False) for medusa in self.instances]
+            position, show = first(futures)
+            if position is None:
+                self.owners.invalidate(slug)
+                # The instances didn't notify, tell why like a single instance would.
+                down = next((medusa for medusa in self.instances if medusa.breaker.is_open()), None)
+                if down:
+                    message = '{0}'.format(breaker.open_error(down.url, down.breaker.retry_in()))
+                else:
+                    message = 'Failed retrieving series with {indexer} id {indexer_id}'.format(
+                        indexer=indexer, indexer_id=indexer_id
+                    )
+                dialog_notification(message, icon=xbmcgui.NOTIFICATION_WARNING)
+                return None
+            owner = self.instances[position]
+            self.owners.set(slug, owner.url)
+            xbmc.log('Series {0} is owned by medusa at {1}'.format(slug, owner.url), xbmc.LOGDEBUG)
+        return dict(show, medusa=owner.url)
+
+    def build_cross_index(self, unique_ids=None):
+        """Build the cross index from the series listings of all medusa instances, and look the show up in it."""
+        from requests.exceptions import RequestException
+
+        try:
+            self.cross_index.replace(index.owned_series(self.instances))
+        except (RequestException, ValueError) as error:
+            xbmc.log('Failed listing the series in medusa, error: {0}'.format(error), xbmc.LOGWARNING)
+            return None
+        return self.cross_index.lookup(unique_ids) if unique_ids else None
+
+    def build_cross_index_later(self, authenticated=None):
+        """Build the cross index on a thread of its own. Returns the thread, or None when it's already being built."""
+        if not self.cross_index_building.acquire(False):
+            return None
+
+        def build():
+            try:
+                wait(authenticated)
+                self.build_cross_index()
+            except Exception as error:
+                xbmc.log('Failed building the cross index, error: {0}'.format(error), xbmc.LOGWARNING)
+            finally:
+                self.cross_index_building.release()
+
+        # Not a daemon, so an invocation without the service finishes the index before it exits.
+        thread = threading.Thread(target=build, name='medusa-cross-index')
+        thread.start()
+        return thread
 
-        if json_response.get('result'):
-            tvdb_id = json_response['result']['tvshowdetails']['imdbnumber']
-            xbmc.log("Found a show for provided episode id, with tvdb id: {0}".format(tvdb_id), xbmc.LOGDEBUG)
+    def match_series(self, item, authenticated=None):
+        """Match kodi's episode -> kodi's show -> medusa's series, using the index or the ListItem's ids."""
+        with metrics.span('resolve'):
+            show = self.indexed_series(item)
+            if show:
+                metrics.set_info('resolve_source', SOURCE_INDEX)
+                return show
 
-        if tvdb_id:
-            return self.medusa.get_series(tvdb_id)
+            unique_ids, source = self.resolver.resolve(item)
+        return self.find_series(unique_ids, source, authenticated)
+
+    def match_tvshow(self, tvshow_db_id, authenticated=None):
+        with metrics.span('resolve'):
+            show = self.index.get(tvshow_db_id)
+            if show:
+                metrics.set_info('resolve_source', SOURCE_INDEX)
+                return show
+
+            unique_ids, source = self.resolver.tvshow_unique_ids(tvshow_db_id)
+        return self.find_series(unique_ids, source, authenticated)
 
     def search_episode(self, show, season, episode):
         """Search for episode using a normal forced search."""
         url = 'home/searchEpisode'
-        params = {
-            'indexername': 'tvdb',
-            'seriesid': show['id']['tvdb'],
-            'season': season,
-            'episode': episode
-        }
-        return self.medusa.web_request(url=url, params=params)
+        params = dict(series_params(show), season=season, episode=episode)
+        return self.owner(show).web_request(url=url, params=params)
 
     def retry_episode(self, show, season, episode):
         """Search for episode using the failed search process."""
         url = 'home/retryEpisode'
-        params = {
-            'indexername': 'tvdb',
-            'seriesid': show['id']['tvdb'],
-            'season': season,
-            'episode': episode,
-            'down_cur_quality': 1
-        }
-        return self.medusa.web_request(url=url, params=params)
+        params = dict(series_params(show), season=season, episode=episode, down_cur_quality=1)
+        return self.owner(show).web_request(url=url, params=params)
+
+    def get_search_status(self, show, season, episode):
+        """
+        Get the status of the episode's search from medusa's search queue.
+
+        :return: The episode's entry, for example {'searchstatus': 'Searching', 'status': 'Wanted', ...} or None when
+            medusa doesn't know about the search (anymore).
+        """
+        url = 'home/getManualSearchStatus'
+        params = dict(series_params(show), season=season, episode=episode)
+        response = self.owner(show).web_request(url=url, params=params)
+        response.raise_for_status()
+        for entry in response.json().get('episodes', []):
+            if int(entry.get('season', -1)) == int(season) and int(entry.get('episode', -1)) == int(episode):
+                return entry
 
-    def start_search(self, show, season, episode):
-        # Start a new forced search
-        dialog_notification('Started search for for S{season}E{episode} of show {show}'.format(
-            season=season, episode=episode, show=show.get('title')
-        ), xbmcgui.NOTIFICATION_INFO)
+    def submit_search(self, show, season, episode):
+        """Ask medusa to start a new failed search. Returns True when medusa accepted it."""
+        from requests.exceptions import HTTPError, RequestException
 
         try:
             response = self.retry_episode(show, season, episode)
             response.raise_for_status()
-        except HTTPError as error:
-            dialog_notification(
-                'Error while trying to start a search. Error: {error}'.format(error=error),
-                xbmcgui.NOTIFICATION_WARNING
-            )
-            xbmc.log('Error while trying to start a search. Error: {error}'.format(error=error), xbmc.LOGERROR)
         except RequestException as error:
-            dialog_notification(
-                'Something went wrong trying to connect to {url}. Error: {error}'.format(
-                    url=self.medusa.url, error=error
-                ),
-                xbmcgui.NOTIFICATION_WARNING
-            )
-            xbmc.log('Something went wrong trying to connect to {url}. Error: {error}'.format(
-                    url=self.medusa.url, error=error
-            ), xbmc.LOGERROR)
+            if transport.unreachable(error):
+                self.queue_search(show, season, episode, error)
+            elif isinstance(error, HTTPError):
+                dialog_notification(
+                    'Error while trying to start a search. Error: {error}'.format(error=error),
+                    xbmcgui.NOTIFICATION_WARNING
+                )
+                xbmc.log('Error while trying to start a search. Error: {error}'.format(error=error), xbmc.LOGERROR)
+            else:
+                dialog_notification(
+                    'Something went wrong trying to connect to {url}. Error: {error}'.format(
+                        url=self.owner(show).url, error=error
+                    ),
+                    xbmcgui.NOTIFICATION_WARNING
+                )
+                xbmc.log('Something went wrong trying to connect to {url}. Error: {error}'.format(
+                        url=self.owner(show).url, error=error
+                ), xbmc.LOGERROR)
         else:
             xbmc.log(
                 'Search url: {url}\nrequest: {request!r}\nresponse: {response!r}'.format(url=response.request.url,
@@ -256,9 +728,8 @@ class MedusaFailed(object):
             )
             json_response = response.json()
             if json_response.get('result') not in ('failure',):
-                dialog_ok('Successful started search for S{season}E{episode} of show {show}'.format(
-                    season=season, episode=episode, show=show.get('title')
-                ))
+                metrics.count('searches_started')
+                return True
             else:
                 dialog_notification(
                     'Error while searching for episode. Error: {error}'.format(error=json_response.get('message')),
@@ -268,16 +739,255 @@ class MedusaFailed(object):
                     'Error while searching for episode. Error: {error}'.format(error=json_response.get('message')),
                     xbmcgui.NOTIFICATION_WARNING
                 )
+        return False
 
-    def run(self):
-        """Run main of plugin."""
-        list_item_show_title = sys.listitem.getVideoInfoTag().getTVShowTitle()
-        list_item_season = sys.listitem.getVideoInfoTag().getSeason()
-        list_item_episode = sys.listitem.getVideoInfoTag().getEpisode()
+    def claim_search(self, show, season, episode):
+        """
+        Claim the episode's search in the in-flight registry.
+
+        :return: None when the search should be submitted. Otherwise the seconds since the search that's already in
+            flight was submitted, which the caller should attach to instead.
+        """
+        age = self.inflight.claim(series_slug(show), season, episode)
+        if age is not None:
+            metrics.count('searches_saved')
+            xbmc.log('A search for S{0}E{1} of show {2} was submitted {3:.0f} seconds ago, not starting another'.format(
+                season, episode, show.get('title'), age
+            ), xbmc.LOGINFO)
+        return age
+
+    def release_search(self, show, season, episode):
+        self.inflight.release(series_slug(show), season, episode)
+
+    def queue_search(self, show, season, episode, error, notify=True):
+        """
+        Journal a search medusa couldn't be reached for. The service submits it once medusa is back.
+
+        Unless the request couldn't connect (or wasn't sent at all), it may have reached medusa. Like a read timeout,
+        which requests reports as a ConnectionError, or a 503. Its replay then checks medusa's search queue first.
+        """
+        attempted = not (transport.connect_failed(error) or breaker.is_open_error(error))
+        added = self.journal.add(self.owner(show).url, series_slug(show), show, season, episode, attempted=attempted)
+        metrics.count('queued')
+        xbmc.log('Medusa is unreachable ({error}), queued the search for S{season}E{episode} of show {show}'.format(
+            error=error, season=season, episode=episode, show=show.get('title')
+        ), xbmc.LOGWARNING)
+        if notify:
+            dialog_notification(
+                'Medusa is unreachable, the search for S{season}E{episode} {state}'.format(
+                    season=season, episode=episode,
+                    state='starts once it is back' if added else 'was already queued'
+                ), icon=xbmcgui.NOTIFICATION_WARNING
+            )
+
+    def replay_search(self, entry):
+        """
+        Submit a search from the journal. Returns False when medusa is still unreachable.
+
+        The attempt is journaled before it's made. An entry that was attempted before is first looked up in
+        medusa's search queue, so a search that reached medusa without us getting the response isn't started twice.
+        """
+        from requests.exceptions import RequestException
+
+        # The search goes to the instance it was queued for.
+        show, season, episode = dict(entry['show'], medusa=entry['url']), entry['season'], entry['episode']
+        if self.claim_search(show, season, episode) is not None:
+            # The episode was clicked again after medusa came back.
+            self.journal.done(entry, 'attached')
+            return True
+
+        previous_attempts = entry.get('attempts', 0)
+        self.journal.attempt(entry)
+        try:
+            with limiter.priority(limiter.BACKGROUND):
+                if previous_attempts and self.get_search_status(show, season, episode):
+                    xbmc.log('Queued search for S{0}E{1} of show {2} already reached medusa'.format(
+                        season, episode, show.get('title')
+                    ), xbmc.LOGINFO)
+                    self.journal.done(entry, 'found')
+                    return True
+
+                response = self.retry_episode(show, season, episode)
+            response.raise_for_status()
+            json_response = response.json()
+        except (RequestException, ValueError) as error:
+            self.release_search(show, season, episode)
+            if isinstance(error, RequestException) and transport.unreachable(error):
+                xbmc.log('Medusa is still unreachable: {0}'.format(error), xbmc.LOGDEBUG)
+                return False
+            xbmc.log('Failed starting queued search for S{0}E{1} of show {2}. Error: {3}'.format(
+                season, episode, show.get('title'), error
+            ), xbmc.LOGWARNING)
+            self.journal.done(entry, 'error')
+            return True
+
+        self.journal.done(entry, json_response.get('result'))
+        if json_response.get('result') in ('failure',):
+            self.release_search(show, season, episode)
+            dialog_notification('Error while searching for episode. Error: {error}'.format(
+                error=json_response.get('message')
+            ), icon=xbmcgui.NOTIFICATION_WARNING)
+        else:
+            dialog_notification('Started queued search for S{season}E{episode} of show {show}'.format(
+                season=season, episode=episode, show=show.get('title')
+            ))
+        return True
+
+    def start_search(self, show, season, episode, record=None):
+        """
+        Start a new failed search on a worker thread, and return right away.
+
+        When we're already following a search for this episode, ask the user whether to stop following it instead.
+
+        :param record: The click's metrics record, finished by the task once the search is submitted.
+        """
+        if SearchTask.is_running(show, season, episode):
+            if dialog.yesno(self.addon_name, 'Already searching for S{season}E{episode} of show {show}. '
+                                             'Stop following this search?'.format(season=season, episode=episode,
+                                                                                 show=show.get('title'))):
+                SearchTask.request_cancel(show, season, episode)
+            return None
+
+        task = SearchTask(self, show, season, episode, record)
+        task.start()
+        return task
+
+    def retry_quietly(self, show, season, episode):
+        """
+        Start a failed search for one episode of a batch, without notifications.
+
+        :return: A tuple of (season, episode, error, attached). The error is None when medusa accepted the search.
+            Attached is True when a search for the episode was already in flight, and no new one was started.
+        """
+        from requests.exceptions import RequestException
 
-        # Let's match kodi's episode dbId -> kodi's series dbId -> medusa's tvdb id.
-        show = self.match_series(sys.listitem.getVideoInfoTag().getDbId())
+        if self.claim_search(show, season, episode) is not None:
+            return season, episode, None, True
+
+        try:
+            # A batch shouldn't hold up clicks on single episodes.
+            with limiter.priority(limiter.BACKGROUND):
+                response = self.retry_episode(show, season, episode)
+            response.raise_for_status()
+            json_response = response.json()
+        except (RequestException, ValueError) as error:
+            self.release_search(show, season, episode)
+            if isinstance(error, RequestException) and transport.unreachable(error):
+                self.queue_search(show, season, episode, error, notify=False)
+                return season, episode, 'medusa is unreachable, queued until it is back', False
+            return season, episode, '{0}'.format(error), False
+
+        if json_response.get('result') in ('failure',):
+            self.release_search(show, season, episode)
+            return season, episode, json_response.get('message') or 'failure', False
+        metrics.count('searches_started')
+        return season, episode, None, False
+
+    def get_episodes(self, item):
+        """Collect the (season, episode) numbers of the season or show, using kodi's json-rpc api."""
+        if item['mediatype'] == 'season':
+            json_response = json_rpc('VideoLibrary.GetSeasonDetails', {
+                "seasonid": int(item['dbid']), "properties": ["tvshowid", "season"]
+            })
+            details = json_response['result']['seasondetails']
+            tvshow_db_id = details['tvshowid']
+            params = {"tvshowid": tvshow_db_id, "season": details['season'], "properties": ["season", "episode"]}
+        else:
+            tvshow_db_id = int(item['dbid'])
+            params = {"tvshowid": tvshow_db_id, "properties": ["season", "episode"]}
+
+        json_response = json_rpc('VideoLibrary.GetEpisodes', params)
+        episodes = [
+            (episode['season'], episode['episode'])
+            for episode in json_response.get('result', {}).get('episodes', [])
+        ]
+        return tvshow_db_id, sorted(episodes)
+
+    def run_batch(self, item, authenticated=None):
+        """Start a failed search for all episodes of a season or show, and show the results in one summary."""
+        tvshow_db_id, episodes = self.get_episodes(item)
+        if item.get('show_ids'):
+            show = self.find_series(item['show_ids'], SOURCE_LISTITEM, authenticated)
+        else:
+            show = self.match_tvshow(tvshow_db_id, authenticated)
+        wait(authenticated)
 
+        if not show:
+            dialog_notification("Medusa could not locate series {0}".format(
+                item['title']
+            ), xbmcgui.NOTIFICATION_WARNING)
+            xbmc.log("Medusa could not locate series {0}".format(item['title']), xbmc.LOGWARNING)
+            return
+
+        if not episodes or not dialog.yesno(self.addon_name, 'Start a failed search for {count} episodes of '
+                                                             'show {show}?'.format(count=len(episodes),
+                                                                                   show=show.get('title'))):
+            return
+
+        progress = xbmcgui.DialogProgressBG()
+        progress.create(self.addon_name, 'Starting searches for {0}'.format(show.get('title')))
+        with metrics.span('retry_episode'):
+            retry_quietly = metrics.bind(self.retry_quietly)
+            futures = [self.pool.submit(retry_quietly, show, season, episode) for season, episode in episodes]
+
+            results = []
+            for future in futures:
+                results.append(future.result())
+                progress.update(int(len(results) * 100 / len(futures)),
+                                message='S{0}E{1}: {2}'.format(results[-1][0], results[-1][1], show.get('title')))
+        progress.close()
+        metrics.count('episodes', len(results))
+
+        failed = ['S{0}E{1}: {2}'.format(season, episode, error) for season, episode, error, _ in results if error]
+        attached = sum(1 for result in results if result[3])
+        summary = ['Started {started} of {total} searches for show {show}.'.format(
+            started=len(results) - len(failed) - attached, total=len(results), show=show.get('title')
+        )]
+        if attached:
+            summary.append('{0} episodes were already being searched for.'.format(attached))
+        if failed:
+            summary += ['', 'Failed:'] + failed
+        dialog.textviewer(self.addon_name, '\n'.join(summary))
+
+    def run(self, item=None):
+        """
+        Run main of plugin.
+
+        :param item: The ListItem's info as collected by `ipc.list_item_info`. Defaults to `sys.listitem`.
+        """
+        if item is None:
+            item = list_item_info(sys.listitem)
+
+        record = metrics.Record(item.get('mediatype') or 'episode')
+        task = None
+        try:
+            with metrics.activate(record):
+                task = self._run(item, record)
+        finally:
+            if task is None:
+                record.finish()
+        return task
+
+    def _run(self, item, record):
+        # Authenticate (using the cached tokens, when they're not about to expire) while the show is resolved in
+        # kodi's library. Only the requests to medusa wait for it.
+        authenticated = spawn(metrics.bind(self.authenticate))
+
+        if item.get('mediatype') in ('season', 'tvshow'):
+            return self.run_batch(item, authenticated)
+
+        list_item_show_title = item['title']
+        list_item_season = item['season']
+        list_item_episode = item['episode']
+
+        # Let's match kodi's episode dbId -> kodi's series dbId -> medusa's series.
+        show = self.match_series(item, authenticated)
+        # Also when the show was matched locally. The search needs it, and a cold click shouldn't exit halfway.
+        wait(authenticated)
+
+        if not show and any(medusa.breaker.is_open() for medusa in self.instances):
+            # The series wasn't indexed, and medusa is down. That was notified already.
+            return
         if not show:
             dialog_notification("Medusa could not locate series {0}".format(
                 list_item_show_title
@@ -286,4 +996,127 @@ class MedusaFailed(object):
             return
 
         # Give medusa the instruction to start a new forced search.
-        self.start_search(show, list_item_season, list_item_episode)
+        return self.start_search(show, list_item_season, list_item_episode, record)
+
+
+class SearchTask(threading.Thread):
+    """
+    Submit a failed search, and follow its progress in medusa's search queue.
+
+    The progress is shown in a background progress dialog. The task is registered as a property of kodi's home
+    window, so a new click on the same episode (possibly from another invocation) can cancel it.
+    Medusa has no way to abort a search that it already started, so cancelling only stops following it. When the
+    task is cancelled before the search is submitted, it isn't submitted at all.
+    When a search for the episode was submitted recently (see the inflight module), the task follows that search
+    instead of submitting another one.
+    """
+
+    POLL_INTERVAL = 2
+    MAX_DURATION = 600
+    PROGRESS = {'queued': 10, 'searching': 50, 'finished': 100}
+
+    def __init__(self, failed, show, season, episode, record=None):
+        super(SearchTask, self).__init__(name='medusa-search')
+        self.failed = failed
+        self.record = record
+        self.show = show
+        self.season = season
+        self.episode = episode
+        self.cancelled = threading.Event()
+        self.property = SearchTask.property_name(show, season, episode)
+
+    @staticmethod
+    def property_name(show, season, episode):
+        return 'context.medusa.failed.search.{series}.{season}.{episode}'.format(
+            series=series_slug(show), season=season, episode=episode
+        )
+
+    @staticmethod
+    def is_running(show, season, episode):
+        return bool(xbmcgui.Window(HOME_WINDOW_ID).getProperty(SearchTask.property_name(show, season, episode)))
+
+    @staticmethod
+    def request_cancel(show, season, episode):
+        xbmcgui.Window(HOME_WINDOW_ID).setProperty(SearchTask.property_name(show, season, episode), 'cancel')
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_cancelled(self):
+        return self.cancelled.is_set() or xbmcgui.Window(HOME_WINDOW_ID).getProperty(self.property) == 'cancel'
+
+    def describe(self):
+        return 'S{season}E{episode} of show {show}'.format(
+            season=self.season, episode=self.episode, show=self.show.get('title')
+        )
+
+    def run(self):
+        window = xbmcgui.Window(HOME_WINDOW_ID)
+        window.setProperty(self.property, 'running')
+        progress = xbmcgui.DialogProgressBG()
+        progress.create(addon_name, 'Starting search for {0}'.format(self.describe()))
+        try:
+            age = None
+            submitted = False
+            with metrics.activate(self.record):
+                with metrics.span('retry_episode'):
+                    if not self.is_cancelled():
+                        age = self.failed.claim_search(self.show, self.season, self.episode)
+                        submitted = age is None and self.failed.submit_search(self.show, self.season, self.episode)
+                        if age is None and not submitted:
+                            self.failed.release_search(self.show, self.season, self.episode)
+            if self.record is not None:
+                self.record.finish()
+
+            if age is not None:
+                dialog_notification('Already searching for {0}, started {1:.0f} minutes ago'.format(
+                    self.describe(), age / 60
+                ))
+            elif submitted:
+                dialog_notification('Started search for {0}'.format(self.describe()))
+            else:
+                return
+            self.follow(progress)
+        finally:
+            progress.close()
+            window.clearProperty(self.property)
+
+    def follow(self, progress):
+        """Poll medusa's search queue until the search finished, was cancelled or takes too long."""
+        from requests.exceptions import RequestException
+
+        monitor = xbmc.Monitor()
+        deadline = time.time() + SearchTask.MAX_DURATION
+        seen = False
+
+        while not monitor.waitForAbort(SearchTask.POLL_INTERVAL):
+            if self.is_cancelled():
+                dialog_notification('Stopped following the search for {0}'.format(self.describe()))
+                return
+
+            try:
+                with limiter.priority(limiter.BACKGROUND):
+                    entry = self.failed.get_search_status(self.show, self.season, self.episode)
+            except (RequestException, ValueError) as error:
+                xbmc.log('Failed getting the search status for {0}. Error: {1}'.format(self.describe(), error),
+                         xbmc.LOGWARNING)
+                entry = None
+
+            if entry:
+                seen = True
+                search_status = entry.get('searchstatus', '').lower()
+                progress.update(SearchTask.PROGRESS.get(search_status, 0),
+                                message='{0}: {1}'.format(entry.get('searchstatus'), self.describe()))
+                if search_status == 'finished':
+                    dialog_notification('Finished search for {0}. Status: {1}'.format(
+                        self.describe(), entry.get('status')
+                    ))
+                    return
+            elif seen:
+                # Medusa only reports the search for a little while after it finished.
+                dialog_notification('Finished search for {0}'.format(self.describe()))
+                return
+
+            if time.time() > deadline:
+                dialog_notification('Search for {0} is still running in medusa'.format(self.describe()))
+                return
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Choose between equivalent base urls of one medusa instance, like its LAN address and a remote hostname.
+
+Requests go to the endpoint that answered fastest in the last health check. When a request can't connect to it,
+`MedusaApi._send` fails over to the next healthy endpoint in the middle of the operation. The service checks the
+health and latency of all endpoints in the background, see `Endpoints.check`.
+
+The endpoint in use and the latencies of the last check are kept in a json file in the addon's profile, so a cold
+click starts with the endpoint that worked last time, without checking all of them first.
+"""
+
+import threading
+import time
+
+import xbmc
+
+from resources.lib.cache import cache_key, profile_path, store
+
+ENDPOINTS_FILE = 'endpoints.json'
+# Seconds between the service's health checks.
+CHECK_INTERVAL = 300
+# (connect, read) timeout of a health check, a request for the endpoint's root url.
+CHECK_TIMEOUT = (3.05, 10)
+
+_endpoints = {}
+_lock = threading.Lock()
+
+
+def get(urls, path=None):
+    """Return the endpoints of the instance with these base urls. All MedusaApi instances in the process share them."""
+    key = tuple(urls)
+    with _lock:
+        if key not in _endpoints:
+            _endpoints[key] = Endpoints(store(path or profile_path(ENDPOINTS_FILE)), urls)
+        return _endpoints[key]
+
+
+class Endpoints(object):
+    """
+    The base urls of one medusa instance, and the one requests currently go to.
+
+    An endpoint that failed a request is skipped, until a health check finds it healthy again.
+    """
+
+    def __init__(self, store, urls):
+        self.store = store
+        self.urls = list(urls)
+        self.key = cache_key(*self.urls)
+        self.lock = threading.Lock()
+        self.failed = set()
+        entry = self.store.get(self.key) or {}
+        self.latencies = entry.get('latencies', {})
+        self.best = entry.get('best') if entry.get('best') in self.urls else self.urls[0]
+
+    def current(self):
+        return self.best
+
+    def _ranked(self):
+        """Return the urls, fastest in the last check first. Urls that weren't checked yet keep their order."""
+        return sorted(self.urls, key=lambda url: self.latencies.get(url, float('inf')))
+
+    def _save(self):
+        self.store.set(self.key, {'best': self.best, 'latencies': self.latencies, 'checked': time.time()})
+
+    def failover(self, url):
+        """
+        Skip an endpoint that a request couldn't connect to.
+
+        :return: The endpoint to try next, or None when all endpoints failed.
+        """
+        with self.lock:
+            self.failed.add(url)
+            healthy = [other for other in self._ranked() if other not in self.failed]
+            if not healthy:
+                return None
+            if self.best == url:
+                self.best = healthy[0]
+                self._save()
+        xbmc.log('Medusa endpoint {0} failed, using {1}'.format(url, self.best), xbmc.LOGWARNING)
+        return self.best
+
+    def reset(self):
+        """Forget the failed endpoints, for example after every endpoint failed one request."""
+        with self.lock:
+            self.failed.clear()
+
+    def check(self, session):
+        """
+        Measure the latency of every endpoint in parallel, and switch to the fastest healthy one.
+
+        An endpoint is healthy when it answers its root url with anything but a server error.
+
+        :param session: The requests session to check them with.
+        """
+        if len(self.urls) == 1:
+            return self.best
+
+        from requests.exceptions import RequestException
+
+        latencies = {}
+
+        def check(url):
+            start = time.time()
+            try:
+                response = session.get(url, verify=False, allow_redirects=False, timeout=CHECK_TIMEOUT)
+            except RequestException as error:
+                xbmc.log('Medusa endpoint {0} is unhealthy: {1}'.format(url, error), xbmc.LOGDEBUG)
+                return
+            if response.status_code < 500:
+                latencies[url] = (time.time() - start) * 1000
+
+        threads = [threading.Thread(target=check, args=(url,), name='medusa-endpoint-check') for url in self.urls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with self.lock:
+            self.latencies = latencies
+            self.failed = set(url for url in self.urls if url not in latencies)
+            previous = self.best
+            if latencies:
+                self.best = self._ranked()[0]
+            self._save()
+        if self.best != previous:
+            xbmc.log('Switched medusa endpoint from {0} to {1}, {2:.0f} ms'.format(
+                previous, self.best, latencies[self.best]
+            ), xbmc.LOGINFO)
+        return self.best
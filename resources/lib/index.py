@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Build the index of kodi's shows -> medusa's series in bulk, from paged listings of kodi's library and medusa.
+
+With the index in place a click is a local lookup, instead of a json-rpc call for the show's unique ids and a request
+for medusa's series. The background service refreshes it, see `refresh`.
+"""
+
+import threading
+import time
+
+import xbmc
+
+from resources.lib.resolver import library_tvshows
+
+# Number of series requested per api/v2/series call.
+SERIES_PAGE_SIZE = 250
+
+_refresh_lock = threading.Lock()
+
+
+def owned_series(instances):
+    """
+    Yield the series of all medusa instances, tagged with the url of the instance that owns them.
+
+    An instance that can't be listed is skipped, unless none of them can.
+    """
+    from requests.exceptions import RequestException
+
+    errors = []
+    for medusa in instances:
+        try:
+            for series in medusa.iter_series(SERIES_PAGE_SIZE):
+                series['medusa'] = medusa.url
+                yield series
+        except (RequestException, ValueError) as error:
+            xbmc.log('Failed listing the series of medusa at {0}: {1}'.format(medusa.url, error), xbmc.LOGWARNING)
+            errors.append(error)
+    if len(errors) == len(instances):
+        raise errors[-1]
+
+
+def refresh(series_index, cross_index, instances):
+    """
+    Bring the index up to date with kodi's library and medusa.
+
+    Only the shows that were added, changed (other unique ids) or expired are matched. When there are any, the cross
+    index is rebuilt from medusa's listing first (unless it was just built), and the shows are matched by any of
+    their unique ids. Shows which are gone from the library are dropped.
+
+    :param series_index: A `cache.SeriesIndex`.
+    :param cross_index: A `cache.CrossIndex`.
+    :param instances: The authenticated `context.MedusaApi` of every medusa instance.
+    :return: The number of shows that were matched, or None when another refresh is already running.
+    """
+    if not _refresh_lock.acquire(False):
+        return None
+
+    try:
+        return _refresh(series_index, cross_index, instances)
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh(series_index, cross_index, instances):
+    start = time.time()
+    entries = series_index.entries()
+
+    library = set()
+    # show dbid -> the show's unique ids.
+    pending = {}
+    for tvshow_db_id, unique_ids, title in library_tvshows():
+        library.add(tvshow_db_id)
+        if not unique_ids:
+            continue
+
+        entry = entries.get(tvshow_db_id)
+        if entry is None or entry['unique_ids'] != unique_ids or not series_index.is_fresh(entry):
+            pending[tvshow_db_id] = unique_ids
+
+    removed = [tvshow_db_id for tvshow_db_id in entries if tvshow_db_id not in library]
+    if removed:
+        series_index.remove(removed)
+
+    if not pending:
+        xbmc.log('Series index is up to date, {0} shows'.format(len(library)), xbmc.LOGDEBUG)
+        return 0
+
+    age = cross_index.age()
+    if age is None or age > cross_index.ttl:
+        series_count = cross_index.replace(owned_series(instances))
+        xbmc.log('Listed {0} series in medusa'.format(series_count), xbmc.LOGDEBUG)
+    tvshow_db_ids = list(pending)
+    all_series = cross_index.lookup_all([pending[tvshow_db_id] for tvshow_db_id in tvshow_db_ids])
+    series_index.update(
+        (tvshow_db_id, pending[tvshow_db_id], series) for tvshow_db_id, series in zip(tvshow_db_ids, all_series)
+    )
+
+    xbmc.log('Matched {matched} of {shows} shows in {ms:.0f} ms, {missing} not found in medusa'.format(
+        matched=len(pending), shows=len(library), ms=(time.time() - start) * 1000,
+        missing=sum(1 for series in all_series if series is None)
+    ), xbmc.LOGINFO)
+    return len(pending)
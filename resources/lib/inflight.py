@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Registry of the searches submitted to medusa recently, to coalesce repeated clicks on the same episode.
+
+The registry is kept in properties of kodi's home window, so it's shared by the service and clicks handled without
+it. A property holds the time the episode's search was submitted.
+"""
+
+import threading
+import time
+
+import xbmcgui
+
+from resources.lib.ipc import HOME_WINDOW_ID
+
+PROPERTY = 'context.medusa.failed.inflight.{0}'
+# Seconds a claim may seem to lie in the future, as the clocks of threads and invocations don't tick in lockstep.
+CLOCK_TOLERANCE = 1
+
+
+class InFlight(object):
+    """
+    Remember which episodes a search was submitted for in the last `window` seconds.
+
+    A window of 0 disables the registry, every click starts a new search.
+    """
+
+    # Claims are checked and set under one lock, so concurrent clicks in one process can't both claim an episode.
+    LOCK = threading.Lock()
+
+    def __init__(self, window):
+        self.window = window
+
+    @staticmethod
+    def key(slug, season, episode):
+        return PROPERTY.format('{0}.{1}.{2}'.format(slug, season, episode))
+
+    def claim(self, slug, season, episode):
+        """
+        Claim the episode's search.
+
+        :return: None when the caller should submit the search, otherwise the seconds since a search for the episode
+            was submitted.
+        """
+        if not self.window:
+            return None
+
+        key = InFlight.key(slug, season, episode)
+        window = xbmcgui.Window(HOME_WINDOW_ID)
+        now = time.time()
+        with InFlight.LOCK:
+            try:
+                age = now - float(window.getProperty(key))
+            except ValueError:
+                age = None
+            if age is not None and -CLOCK_TOLERANCE <= age < self.window:
+                return max(age, 0)
+            window.setProperty(key, repr(now))
+        return None
+
+    def release(self, slug, season, episode):
+        """Drop a claim, when the search couldn't be submitted after all."""
+        xbmcgui.Window(HOME_WINDOW_ID).clearProperty(InFlight.key(slug, season, episode))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Hand context menu clicks to the background service over a local socket.
+
+This module is imported by main.py on every click, so it should only depend on the standard library and Kodi's
+modules. The service publishes the port it listens on as a property of Kodi's home window.
+"""
+
+import json
+import socket
+import threading
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+import xbmc
+import xbmcgui
+
+from resources.lib.resolver import list_item_ids
+
+HOME_WINDOW_ID = 10000
+PORT_PROPERTY = 'context.medusa.failed.port'
+CONNECT_TIMEOUT = 0.5
+# Seconds to wait for the service to acknowledge a request it accepted. It may be busy, like refreshing its index.
+ACK_TIMEOUT = 10
+ACK = b'ok\n'
+
+
+def list_item_info(list_item):
+    """Collect everything we need from the ListItem, as it can't be handed to the service itself."""
+    info_tag = list_item.getVideoInfoTag()
+    tvshow_db_id, show_ids = list_item_ids(list_item, info_tag)
+    return {
+        'mediatype': info_tag.getMediaType(),
+        'dbid': info_tag.getDbId(),
+        'title': info_tag.getTVShowTitle() or info_tag.getTitle(),
+        'season': info_tag.getSeason(),
+        'episode': info_tag.getEpisode(),
+        'tvshow_dbid': tvshow_db_id,
+        'show_ids': show_ids,
+    }
+
+
+def send_request(item):
+    """
+    Send the item to the service. Returns True when the service accepted it.
+
+    When the service isn't running (or the port is stale) this returns False, and the caller should handle the
+    item itself. Once the service accepted the connection and got the item, it's considered handed over, also when
+    the acknowledgement doesn't come in time. Handling it here as well could start the search twice.
+    """
+    port = xbmcgui.Window(HOME_WINDOW_ID).getProperty(PORT_PROPERTY)
+    if not port:
+        return False
+
+    try:
+        connection = socket.create_connection(('127.0.0.1', int(port)), timeout=CONNECT_TIMEOUT)
+    except (socket.error, ValueError) as error:
+        xbmc.log('Medusa service is not reachable on port {0}: {1}'.format(port, error), xbmc.LOGDEBUG)
+        return False
+
+    try:
+        connection.sendall(json.dumps(item).encode('utf-8') + b'\n')
+        connection.settimeout(ACK_TIMEOUT)
+        return connection.recv(len(ACK)) == ACK
+    except socket.timeout:
+        xbmc.log('Medusa service did not acknowledge the request in time, leaving it to the service', xbmc.LOGWARNING)
+        return True
+    except socket.error as error:
+        xbmc.log('Failed handing request to the medusa service: {0}'.format(error), xbmc.LOGWARNING)
+        return False
+    finally:
+        connection.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            item = json.loads(self.rfile.readline().decode('utf-8'))
+        except ValueError as error:
+            xbmc.log('Medusa service received an invalid request: {0}'.format(error), xbmc.LOGWARNING)
+            return
+
+        # Acknowledge first, so the client can return right away.
+        self.wfile.write(ACK)
+        self.wfile.flush()
+        self.server.callback(item)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ServiceServer(object):
+    """Listen on a local port for requests from main.py, and call the callback for each of them on its own thread."""
+
+    def __init__(self, callback):
+        self.server = _Server(('127.0.0.1', 0), _RequestHandler)
+        self.server.callback = callback
+        self.thread = threading.Thread(target=self.server.serve_forever, name='medusa-ipc')
+        self.thread.daemon = True
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        xbmcgui.Window(HOME_WINDOW_ID).setProperty(PORT_PROPERTY, str(self.port))
+        xbmc.log('Medusa service listening on port {0}'.format(self.port), xbmc.LOGINFO)
+
+    def stop(self):
+        xbmcgui.Window(HOME_WINDOW_ID).clearProperty(PORT_PROPERTY)
+        self.server.shutdown()
+        self.server.server_close()
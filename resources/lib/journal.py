@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+A durable journal of the failed searches that couldn't be submitted, because medusa wasn't reachable.
+
+The journal is an append-only file of json lines in the addon's profile, fsync'd on every write. The state of an
+entry is the fold of its lines: added, attempted (with the time of its next attempt) and done. The service's
+`Replayer` drains it with an exponential backoff once medusa is back, and compacts it when it's mostly done entries.
+
+Entries are keyed by medusa's url, the series, season and episode, so queueing the same search twice only adds it
+once. Before an entry is submitted again, medusa's search queue is checked for the episode: an earlier attempt may
+have reached medusa, even though we didn't get its response.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import xbmc
+
+from resources.lib.cache import atomic_write
+
+JOURNAL_FILE = 'retries.journal'
+# Seconds before the first replay of an entry. Every next attempt waits twice as long, up to BACKOFF_MAX.
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+# Entries which couldn't be submitted within this many seconds are dropped.
+MAX_AGE = 24 * 3600
+# Seconds between the replayer's checks of the journal.
+REPLAY_INTERVAL = 15
+# Compact the journal once it has this many lines more than there are pending entries.
+COMPACT_LINES = 100
+
+
+def entry_id(url, slug, season, episode):
+    return hashlib.sha1('{0}|{1}|{2}|{3}'.format(url, slug, season, episode).encode('utf-8')).hexdigest()
+
+
+def backoff(attempts):
+    """Return the seconds to wait before the next attempt, with jitter so entries don't all fire at once."""
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(attempts - 1, 0)) * random.uniform(0.5, 1)
+
+
+class RetryJournal(object):
+    """The pending searches, persisted as an append-only journal. See the module's docstring."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+
+    def _append(self, record):
+        with self.lock:
+            with open(self.path, 'a') as fp:
+                fp.write(json.dumps(record) + '\n')
+                fp.flush()
+                os.fsync(fp.fileno())
+
+    def _read(self):
+        """Return the journal's records, and the size of the file they were read from."""
+        records = []
+        try:
+            with open(self.path, 'r') as fp:
+                data = fp.read()
+        except (IOError, OSError):
+            return records, 0
+
+        for line in data.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A line that was only partially written, when kodi was killed.
+                continue
+        return records, len(data)
+
+    @staticmethod
+    def _fold(records):
+        entries = {}
+        for record in records:
+            operation = record.get('op')
+            if operation == 'add':
+                entries.setdefault(record['id'], dict(record))
+            elif operation == 'attempt' and record['id'] in entries:
+                entries[record['id']].update(attempts=record['attempts'], next=record['next'])
+            elif operation == 'done':
+                entries.pop(record['id'], None)
+        return entries
+
+    def pending(self):
+        """Return the pending entries, oldest first."""
+        with self.lock:
+            entries = RetryJournal._fold(self._read()[0])
+        return sorted(entries.values(), key=lambda entry: entry['added'])
+
+    def add(self, url, slug, show, season, episode, attempted=False):
+        """
+        Add a search to the journal. Returns False when it was already pending.
+
+        :param attempted: The search may have reached medusa, so its replay checks medusa's search queue first.
+        """
+        key = entry_id(url, slug, season, episode)
+        with self.lock:
+            if key in RetryJournal._fold(self._read()[0]):
+                return False
+            now = time.time()
+            self._append({
+                'op': 'add', 'id': key, 'url': url, 'show': show, 'season': season, 'episode': episode,
+                'added': now, 'attempts': 1 if attempted else 0, 'next': now + backoff(1),
+            })
+        return True
+
+    def attempt(self, entry):
+        """Record an attempt, before it's made. Schedules the next attempt, for when this one fails."""
+        attempts = entry.get('attempts', 0) + 1
+        self._append({
+            'op': 'attempt', 'id': entry['id'], 'attempts': attempts, 'next': time.time() + backoff(attempts)
+        })
+        return attempts
+
+    def done(self, entry, result):
+        self._append({'op': 'done', 'id': entry['id'], 'result': result})
+
+    def compact(self, force=False):
+        """
+        Rewrite the journal with only the pending entries, once enough lines are done.
+
+        The new journal is written next to it and renamed over it, see `atomic_write`. The rewrite is skipped when
+        another invocation appended to the journal in the meantime, the next compaction picks that up.
+        """
+        with self.lock:
+            records, size = self._read()
+            entries = RetryJournal._fold(records)
+            if not force and len(records) - len(entries) < COMPACT_LINES:
+                return False
+
+            content = ''.join(
+                json.dumps(entry) + '\n' for entry in sorted(entries.values(), key=lambda entry: entry['added'])
+            )
+            if os.path.exists(self.path) and os.path.getsize(self.path) != size:
+                return False
+            atomic_write(self.path, content, sync=True)
+            return True
+
+
+class Replayer(threading.Thread):
+    """
+    Submit the journal's pending searches, once medusa is reachable again.
+
+    :param get_failed: Returns the service's `MedusaFailed`, or None when the addon isn't configured.
+    """
+
+    def __init__(self, get_failed):
+        super(Replayer, self).__init__(name='medusa-retry-replayer')
+        self.daemon = True
+        self.get_failed = get_failed
+        self.stopped = threading.Event()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        monitor = xbmc.Monitor()
+        while not monitor.waitForAbort(REPLAY_INTERVAL) and not self.stopped.is_set():
+            try:
+                self.replay()
+            except Exception as error:
+                xbmc.log('Failed replaying the queued searches: {0}'.format(error), xbmc.LOGWARNING)
+
+    def replay(self):
+        """Submit the entries that are due. Stops at the first entry per instance that finds it still unreachable."""
+        failed = self.get_failed()
+        if failed is None:
+            return
+
+        journal = failed.journal
+        now = time.time()
+        down = set()
+        for entry in journal.pending():
+            if now - entry['added'] > MAX_AGE:
+                xbmc.log('Dropping queued search for S{season}E{episode} of show {title}, medusa was unreachable '
+                         'for too long'.format(title=entry['show'].get('title'), **entry), xbmc.LOGWARNING)
+                journal.done(entry, 'expired')
+                continue
+            # Searches queued for a medusa url that's not configured anymore are left to expire.
+            medusa = failed.instance(entry['url'])
+            if medusa is None or entry['url'] in down or entry['next'] > now:
+                continue
+            # While the circuit is open, the service probes medusa until it's back. See the breaker module.
+            if medusa.breaker.is_open() or not failed.replay_search(entry):
+                down.add(entry['url'])
+
+        journal.compact()
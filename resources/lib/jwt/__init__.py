@@ -18,7 +18,8 @@ __copyright__ = 'Copyright 2015 José Padilla'
 
 from .api_jwt import (
     encode, decode, register_algorithm, unregister_algorithm,
-    get_unverified_header, PyJWT
+    get_unverified_header, decode_unverified_claims, get_key_cache_stats,
+    clear_key_cache, PyJWT
 )
 from .api_jws import PyJWS
 from .exceptions import (
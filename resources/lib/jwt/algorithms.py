@@ -1,6 +1,9 @@
+import functools
 import hashlib
 import hmac
 import json
+import threading
+from collections import OrderedDict
 
 
 from .compat import constant_time_compare, string_types
@@ -11,58 +14,177 @@ from .utils import (
     to_base64url_uint
 )
 
-try:
-    from cryptography.hazmat.primitives import hashes
-    from cryptography.hazmat.primitives.serialization import (
-        load_pem_private_key, load_pem_public_key, load_ssh_public_key
-    )
-    from cryptography.hazmat.primitives.asymmetric.rsa import (
-        RSAPrivateKey, RSAPublicKey, RSAPrivateNumbers, RSAPublicNumbers,
-        rsa_recover_prime_factors, rsa_crt_dmp1, rsa_crt_dmq1, rsa_crt_iqmp
-    )
-    from cryptography.hazmat.primitives.asymmetric.ec import (
-        EllipticCurvePrivateKey, EllipticCurvePublicKey
-    )
-    from cryptography.hazmat.primitives.asymmetric import ec, padding
-    from cryptography.hazmat.backends import default_backend
-    from cryptography.exceptions import InvalidSignature
-
-    has_crypto = True
-except ImportError:
-    has_crypto = False
+
+def _find_crypto():
+    """
+    Whether cryptography is installed. It's looked up without importing it,
+    as importing it is slow.
+
+    Unlike before, a cryptography that's installed but fails to import
+    counts as installed. Its algorithms are then reported as unsupported
+    when they're first used, see AlgorithmRegistry.
+    """
+    try:
+        from importlib.util import find_spec
+    except ImportError:
+        # Python 2
+        import imp
+        try:
+            imp.find_module('cryptography')
+        except ImportError:
+            return False
+        return True
+    return find_spec('cryptography') is not None
+
+
+has_crypto = _find_crypto()
+
+# Number of prepared keys a PyJWS keeps by default, see PreparedKeyCache.
+KEY_CACHE_SIZE = 32
 
 requires_cryptography = set(['RS256', 'RS384', 'RS512', 'ES256', 'ES384',
                              'ES521', 'ES512', 'PS256', 'PS384', 'PS512'])
 
 
+def _create_crypto_algorithm(algorithm_class, hash_name):
+    # Reading the hash attribute imports cryptography, see _CryptoHash.
+    return algorithm_class(getattr(algorithm_class, hash_name))
+
+
 def get_default_algorithms():
     """
     Returns the algorithms that are implemented by the library.
+
+    The algorithms are registered as factories, and only created (and
+    cryptography imported) when they're first looked up. See
+    `AlgorithmRegistry`.
     """
-    default_algorithms = {
-        'none': NoneAlgorithm(),
-        'HS256': HMACAlgorithm(HMACAlgorithm.SHA256),
-        'HS384': HMACAlgorithm(HMACAlgorithm.SHA384),
-        'HS512': HMACAlgorithm(HMACAlgorithm.SHA512)
-    }
+    default_algorithms = AlgorithmRegistry({
+        'none': NoneAlgorithm,
+        'HS256': functools.partial(HMACAlgorithm, hashlib.sha256),
+        'HS384': functools.partial(HMACAlgorithm, hashlib.sha384),
+        'HS512': functools.partial(HMACAlgorithm, hashlib.sha512)
+    })
 
     if has_crypto:
-        default_algorithms.update({
-            'RS256': RSAAlgorithm(RSAAlgorithm.SHA256),
-            'RS384': RSAAlgorithm(RSAAlgorithm.SHA384),
-            'RS512': RSAAlgorithm(RSAAlgorithm.SHA512),
-            'ES256': ECAlgorithm(ECAlgorithm.SHA256),
-            'ES384': ECAlgorithm(ECAlgorithm.SHA384),
-            'ES521': ECAlgorithm(ECAlgorithm.SHA512),
-            'ES512': ECAlgorithm(ECAlgorithm.SHA512),  # Backward compat for #219 fix
-            'PS256': RSAPSSAlgorithm(RSAPSSAlgorithm.SHA256),
-            'PS384': RSAPSSAlgorithm(RSAPSSAlgorithm.SHA384),
-            'PS512': RSAPSSAlgorithm(RSAPSSAlgorithm.SHA512)
-        })
+        crypto_algorithms = {
+            'RS256': (RSAAlgorithm, 'SHA256'),
+            'RS384': (RSAAlgorithm, 'SHA384'),
+            'RS512': (RSAAlgorithm, 'SHA512'),
+            'ES256': (ECAlgorithm, 'SHA256'),
+            'ES384': (ECAlgorithm, 'SHA384'),
+            'ES521': (ECAlgorithm, 'SHA512'),
+            'ES512': (ECAlgorithm, 'SHA512'),  # Backward compat for #219 fix
+            'PS256': (RSAPSSAlgorithm, 'SHA256'),
+            'PS384': (RSAPSSAlgorithm, 'SHA384'),
+            'PS512': (RSAPSSAlgorithm, 'SHA512')
+        }
+        default_algorithms.update(
+            (alg_id, functools.partial(_create_crypto_algorithm, *args))
+            for alg_id, args in crypto_algorithms.items()
+        )
 
     return default_algorithms
 
 
+class AlgorithmRegistry(dict):
+    """
+    A dict of alg id -> Algorithm, whose values may be factories instead.
+
+    A factory is called when its alg is first looked up with [], and
+    replaced by the Algorithm it created. A factory that fails to import
+    what it needs (cryptography) is reported as a missing alg, a KeyError.
+    Iterating, `in` and `del` don't create the algorithms.
+    """
+
+    def __getitem__(self, alg_id):
+        value = dict.__getitem__(self, alg_id)
+        if not isinstance(value, Algorithm):
+            try:
+                value = value()
+            except ImportError:
+                raise KeyError(alg_id)
+            self[alg_id] = value
+        return value
+
+
+class PreparedKeyCache(object):
+    """
+    A bounded LRU cache of prepared keys, keyed by alg id and key bytes.
+
+    Parsing a PEM or SSH key is by far the most expensive step of signing
+    or verifying a token with an RSA or EC key, and it was done again on
+    every call. Only keys given as strings or bytes are cached, key
+    objects are already prepared. A maxsize of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=KEY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def prepare(self, alg_id, alg_obj, key):
+        """
+        Returns alg_obj.prepare_signing_key(key), from the cache when the
+        key was prepared for this alg before.
+        """
+        if not self.maxsize or not isinstance(key, string_types):
+            return alg_obj.prepare_key(key)
+
+        cache_key = (alg_id, force_bytes(key))
+        with self._lock:
+            if cache_key in self._keys:
+                self.hits += 1
+                # Move it to the end, the most recently used.
+                prepared = self._keys.pop(cache_key)
+                self._keys[cache_key] = prepared
+                return prepared
+            self.misses += 1
+
+        # Invalid keys raise here, and aren't cached.
+        prepared = alg_obj.prepare_signing_key(key)
+
+        with self._lock:
+            self._keys[cache_key] = prepared
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+                self.evictions += 1
+        return prepared
+
+    def stats(self):
+        """
+        Returns the cache's statistics as a dict(), with the keys hits,
+        misses, evictions, size and maxsize.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._keys),
+                'maxsize': self.maxsize,
+            }
+
+    def discard(self, alg_id):
+        """
+        Drops the keys prepared for alg_id, for when its Algorithm is
+        replaced. They aren't counted as evictions.
+        """
+        with self._lock:
+            for cache_key in [cache_key for cache_key in self._keys
+                              if cache_key[0] == alg_id]:
+                del self._keys[cache_key]
+
+    def clear(self):
+        """Drops the prepared keys, and resets the statistics."""
+        with self._lock:
+            self._keys.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
 class Algorithm(object):
     """
     The interface for an algorithm used to sign and verify tokens.
@@ -74,6 +196,14 @@ class Algorithm(object):
         """
         raise NotImplementedError
 
+    def prepare_signing_key(self, key):
+        """
+        Performs prepare_key, returning the key in the form sign and verify
+        use fastest. That's only worth it for keys used more than once,
+        like the ones PreparedKeyCache keeps.
+        """
+        return self.prepare_key(key)
+
     def sign(self, msg, key):
         """
         Returns a digital signature for the specified message
@@ -169,216 +299,310 @@ class HMACAlgorithm(Algorithm):
 
         return base64url_decode(obj['k'])
 
+    def prepare_signing_key(self, key):
+        return HMACSigner(self.prepare_key(key), self.hash_alg)
+
     def sign(self, msg, key):
+        if isinstance(key, HMACSigner):
+            if key.hash_alg is self.hash_alg:
+                return key.sign(msg)
+            key = key.key
         return hmac.new(key, msg, self.hash_alg).digest()
 
     def verify(self, msg, key, sig):
         return constant_time_compare(sig, self.sign(msg, key))
 
 
-if has_crypto:
+class HMACSigner(object):
+    """
+    Signs and verifies with one HMAC key.
 
-    class RSAAlgorithm(Algorithm):
-        """
-        Performs signing and verification operations using
-        RSASSA-PKCS-v1_5 and the specified hash function.
-        """
-        SHA256 = hashes.SHA256
-        SHA384 = hashes.SHA384
-        SHA512 = hashes.SHA512
-
-        def __init__(self, hash_alg):
-            self.hash_alg = hash_alg
-
-        def prepare_key(self, key):
-            if isinstance(key, RSAPrivateKey) or \
-               isinstance(key, RSAPublicKey):
-                return key
-
-            if isinstance(key, string_types):
-                key = force_bytes(key)
-
-                try:
-                    if key.startswith(b'ssh-rsa'):
-                        key = load_ssh_public_key(key, backend=default_backend())
-                    else:
-                        key = load_pem_private_key(key, password=None, backend=default_backend())
-                except ValueError:
-                    key = load_pem_public_key(key, backend=default_backend())
-            else:
-                raise TypeError('Expecting a PEM-formatted key.')
+    hmac.new pads the key and hashes the inner and outer pads on every
+    call. The signer does that once, and signs each message with a copy()
+    of that state. Returned by HMACAlgorithm.prepare_signing_key, and
+    accepted as the key by HMACAlgorithm.sign and verify.
+    """
 
-            return key
+    def __init__(self, key, hash_alg):
+        self.key = key
+        self.hash_alg = hash_alg
+        self._state = hmac.new(key, digestmod=hash_alg)
 
-        @staticmethod
-        def to_jwk(key_obj):
-            obj = None
-
-            if getattr(key_obj, 'private_numbers', None):
-                # Private key
-                numbers = key_obj.private_numbers()
-
-                obj = {
-                    'kty': 'RSA',
-                    'key_ops': ['sign'],
-                    'n': force_unicode(to_base64url_uint(numbers.public_numbers.n)),
-                    'e': force_unicode(to_base64url_uint(numbers.public_numbers.e)),
-                    'd': force_unicode(to_base64url_uint(numbers.d)),
-                    'p': force_unicode(to_base64url_uint(numbers.p)),
-                    'q': force_unicode(to_base64url_uint(numbers.q)),
-                    'dp': force_unicode(to_base64url_uint(numbers.dmp1)),
-                    'dq': force_unicode(to_base64url_uint(numbers.dmq1)),
-                    'qi': force_unicode(to_base64url_uint(numbers.iqmp))
-                }
-
-            elif getattr(key_obj, 'verify', None):
-                # Public key
-                numbers = key_obj.public_numbers()
-
-                obj = {
-                    'kty': 'RSA',
-                    'key_ops': ['verify'],
-                    'n': force_unicode(to_base64url_uint(numbers.n)),
-                    'e': force_unicode(to_base64url_uint(numbers.e))
-                }
-            else:
-                raise InvalidKeyError('Not a public or private key')
+    def sign(self, msg):
+        state = self._state.copy()
+        state.update(msg)
+        return state.digest()
 
-            return json.dumps(obj)
+    def verify(self, msg, sig):
+        return constant_time_compare(sig, self.sign(msg))
+
+
+class _CryptoHash(object):
+    """
+    A hash class of cryptography, as a class attribute. cryptography is
+    imported when the attribute is first read, not with this module.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        from cryptography.hazmat.primitives import hashes
+        return getattr(hashes, self.name)
+
+
+class RSAAlgorithm(Algorithm):
+    """
+    Performs signing and verification operations using
+    RSASSA-PKCS-v1_5 and the specified hash function.
+    """
+    SHA256 = _CryptoHash('SHA256')
+    SHA384 = _CryptoHash('SHA384')
+    SHA512 = _CryptoHash('SHA512')
+
+    def __init__(self, hash_alg):
+        self.hash_alg = hash_alg
+
+    def prepare_key(self, key):
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives.asymmetric.rsa import (
+            RSAPrivateKey, RSAPublicKey
+        )
+        from cryptography.hazmat.primitives.serialization import (
+            load_pem_private_key, load_pem_public_key, load_ssh_public_key
+        )
+
+        if isinstance(key, RSAPrivateKey) or \
+           isinstance(key, RSAPublicKey):
+            return key
+
+        if isinstance(key, string_types):
+            key = force_bytes(key)
 
-        @staticmethod
-        def from_jwk(jwk):
             try:
-                obj = json.loads(jwk)
+                if key.startswith(b'ssh-rsa'):
+                    key = load_ssh_public_key(key, backend=default_backend())
+                else:
+                    key = load_pem_private_key(key, password=None, backend=default_backend())
             except ValueError:
-                raise InvalidKeyError('Key is not valid JSON')
+                key = load_pem_public_key(key, backend=default_backend())
+        else:
+            raise TypeError('Expecting a PEM-formatted key.')
 
-            if obj.get('kty') != 'RSA':
-                raise InvalidKeyError('Not an RSA key')
-
-            if 'd' in obj and 'e' in obj and 'n' in obj:
-                # Private key
-                if 'oth' in obj:
-                    raise InvalidKeyError('Unsupported RSA private key: > 2 primes not supported')
+        return key
 
-                other_props = ['p', 'q', 'dp', 'dq', 'qi']
-                props_found = [prop in obj for prop in other_props]
-                any_props_found = any(props_found)
+    @staticmethod
+    def to_jwk(key_obj):
+        obj = None
+
+        if getattr(key_obj, 'private_numbers', None):
+            # Private key
+            numbers = key_obj.private_numbers()
+
+            obj = {
+                'kty': 'RSA',
+                'key_ops': ['sign'],
+                'n': force_unicode(to_base64url_uint(numbers.public_numbers.n)),
+                'e': force_unicode(to_base64url_uint(numbers.public_numbers.e)),
+                'd': force_unicode(to_base64url_uint(numbers.d)),
+                'p': force_unicode(to_base64url_uint(numbers.p)),
+                'q': force_unicode(to_base64url_uint(numbers.q)),
+                'dp': force_unicode(to_base64url_uint(numbers.dmp1)),
+                'dq': force_unicode(to_base64url_uint(numbers.dmq1)),
+                'qi': force_unicode(to_base64url_uint(numbers.iqmp))
+            }
+
+        elif getattr(key_obj, 'verify', None):
+            # Public key
+            numbers = key_obj.public_numbers()
+
+            obj = {
+                'kty': 'RSA',
+                'key_ops': ['verify'],
+                'n': force_unicode(to_base64url_uint(numbers.n)),
+                'e': force_unicode(to_base64url_uint(numbers.e))
+            }
+        else:
+            raise InvalidKeyError('Not a public or private key')
+
+        return json.dumps(obj)
 
-                if any_props_found and not all(props_found):
-                    raise InvalidKeyError('RSA key must include all parameters if any are present besides d')
+    @staticmethod
+    def from_jwk(jwk):
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives.asymmetric.rsa import (
+            RSAPrivateNumbers, RSAPublicNumbers, rsa_crt_dmp1, rsa_crt_dmq1,
+            rsa_crt_iqmp, rsa_recover_prime_factors
+        )
+
+        try:
+            obj = json.loads(jwk)
+        except ValueError:
+            raise InvalidKeyError('Key is not valid JSON')
+
+        if obj.get('kty') != 'RSA':
+            raise InvalidKeyError('Not an RSA key')
+
+        if 'd' in obj and 'e' in obj and 'n' in obj:
+            # Private key
+            if 'oth' in obj:
+                raise InvalidKeyError('Unsupported RSA private key: > 2 primes not supported')
+
+            other_props = ['p', 'q', 'dp', 'dq', 'qi']
+            props_found = [prop in obj for prop in other_props]
+            any_props_found = any(props_found)
+
+            if any_props_found and not all(props_found):
+                raise InvalidKeyError('RSA key must include all parameters if any are present besides d')
+
+            public_numbers = RSAPublicNumbers(
+                from_base64url_uint(obj['e']), from_base64url_uint(obj['n'])
+            )
 
-                public_numbers = RSAPublicNumbers(
-                    from_base64url_uint(obj['e']), from_base64url_uint(obj['n'])
+            if any_props_found:
+                numbers = RSAPrivateNumbers(
+                    d=from_base64url_uint(obj['d']),
+                    p=from_base64url_uint(obj['p']),
+                    q=from_base64url_uint(obj['q']),
+                    dmp1=from_base64url_uint(obj['dp']),
+                    dmq1=from_base64url_uint(obj['dq']),
+                    iqmp=from_base64url_uint(obj['qi']),
+                    public_numbers=public_numbers
+                )
+            else:
+                d = from_base64url_uint(obj['d'])
+                p, q = rsa_recover_prime_factors(
+                    public_numbers.n, d, public_numbers.e
                 )
 
-                if any_props_found:
-                    numbers = RSAPrivateNumbers(
-                        d=from_base64url_uint(obj['d']),
-                        p=from_base64url_uint(obj['p']),
-                        q=from_base64url_uint(obj['q']),
-                        dmp1=from_base64url_uint(obj['dp']),
-                        dmq1=from_base64url_uint(obj['dq']),
-                        iqmp=from_base64url_uint(obj['qi']),
-                        public_numbers=public_numbers
-                    )
-                else:
-                    d = from_base64url_uint(obj['d'])
-                    p, q = rsa_recover_prime_factors(
-                        public_numbers.n, d, public_numbers.e
-                    )
-
-                    numbers = RSAPrivateNumbers(
-                        d=d,
-                        p=p,
-                        q=q,
-                        dmp1=rsa_crt_dmp1(d, p),
-                        dmq1=rsa_crt_dmq1(d, q),
-                        iqmp=rsa_crt_iqmp(p, q),
-                        public_numbers=public_numbers
-                    )
-
-                return numbers.private_key(default_backend())
-            elif 'n' in obj and 'e' in obj:
-                # Public key
-                numbers = RSAPublicNumbers(
-                    from_base64url_uint(obj['e']), from_base64url_uint(obj['n'])
+                numbers = RSAPrivateNumbers(
+                    d=d,
+                    p=p,
+                    q=q,
+                    dmp1=rsa_crt_dmp1(d, p),
+                    dmq1=rsa_crt_dmq1(d, q),
+                    iqmp=rsa_crt_iqmp(p, q),
+                    public_numbers=public_numbers
                 )
 
-                return numbers.public_key(default_backend())
-            else:
-                raise InvalidKeyError('Not a public or private key')
+            return numbers.private_key(default_backend())
+        elif 'n' in obj and 'e' in obj:
+            # Public key
+            numbers = RSAPublicNumbers(
+                from_base64url_uint(obj['e']), from_base64url_uint(obj['n'])
+            )
 
-        def sign(self, msg, key):
-            return key.sign(msg, padding.PKCS1v15(), self.hash_alg())
+            return numbers.public_key(default_backend())
+        else:
+            raise InvalidKeyError('Not a public or private key')
 
-        def verify(self, msg, key, sig):
-            try:
-                key.verify(sig, msg, padding.PKCS1v15(), self.hash_alg())
-                return True
-            except InvalidSignature:
-                return False
+    def sign(self, msg, key):
+        from cryptography.hazmat.primitives.asymmetric import padding
 
-    class ECAlgorithm(Algorithm):
-        """
-        Performs signing and verification operations using
-        ECDSA and the specified hash function
-        """
-        SHA256 = hashes.SHA256
-        SHA384 = hashes.SHA384
-        SHA512 = hashes.SHA512
-
-        def __init__(self, hash_alg):
-            self.hash_alg = hash_alg
-
-        def prepare_key(self, key):
-            if isinstance(key, EllipticCurvePrivateKey) or \
-               isinstance(key, EllipticCurvePublicKey):
-                return key
-
-            if isinstance(key, string_types):
-                key = force_bytes(key)
-
-                # Attempt to load key. We don't know if it's
-                # a Signing Key or a Verifying Key, so we try
-                # the Verifying Key first.
-                try:
-                    if key.startswith(b'ecdsa-sha2-'):
-                        key = load_ssh_public_key(key, backend=default_backend())
-                    else:
-                        key = load_pem_public_key(key, backend=default_backend())
-                except ValueError:
-                    key = load_pem_private_key(key, password=None, backend=default_backend())
+        return key.sign(msg, padding.PKCS1v15(), self.hash_alg())
 
-            else:
-                raise TypeError('Expecting a PEM-formatted key.')
+    def verify(self, msg, key, sig):
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives.asymmetric import padding
 
-            return key
+        try:
+            key.verify(sig, msg, padding.PKCS1v15(), self.hash_alg())
+            return True
+        except InvalidSignature:
+            return False
 
-        def sign(self, msg, key):
-            der_sig = key.sign(msg, ec.ECDSA(self.hash_alg()))
 
-            return der_to_raw_signature(der_sig, key.curve)
+class ECAlgorithm(Algorithm):
+    """
+    Performs signing and verification operations using
+    ECDSA and the specified hash function
+    """
+    SHA256 = _CryptoHash('SHA256')
+    SHA384 = _CryptoHash('SHA384')
+    SHA512 = _CryptoHash('SHA512')
 
-        def verify(self, msg, key, sig):
+    def __init__(self, hash_alg):
+        self.hash_alg = hash_alg
+
+    def prepare_key(self, key):
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives.asymmetric.ec import (
+            EllipticCurvePrivateKey, EllipticCurvePublicKey
+        )
+        from cryptography.hazmat.primitives.serialization import (
+            load_pem_private_key, load_pem_public_key, load_ssh_public_key
+        )
+
+        if isinstance(key, EllipticCurvePrivateKey) or \
+           isinstance(key, EllipticCurvePublicKey):
+            return key
+
+        if isinstance(key, string_types):
+            key = force_bytes(key)
+
+            # Attempt to load key. We don't know if it's
+            # a Signing Key or a Verifying Key, so we try
+            # the Verifying Key first.
             try:
-                der_sig = raw_to_der_signature(sig, key.curve)
+                if key.startswith(b'ecdsa-sha2-'):
+                    key = load_ssh_public_key(key, backend=default_backend())
+                else:
+                    key = load_pem_public_key(key, backend=default_backend())
             except ValueError:
-                return False
+                key = load_pem_private_key(key, password=None, backend=default_backend())
 
-            try:
-                key.verify(der_sig, msg, ec.ECDSA(self.hash_alg()))
-                return True
-            except InvalidSignature:
-                return False
+        else:
+            raise TypeError('Expecting a PEM-formatted key.')
 
-    class RSAPSSAlgorithm(RSAAlgorithm):
-        """
-        Performs a signature using RSASSA-PSS with MGF1
-        """
+        return key
+
+    def sign(self, msg, key):
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        der_sig = key.sign(msg, ec.ECDSA(self.hash_alg()))
+
+        return der_to_raw_signature(der_sig, key.curve)
+
+    def verify(self, msg, key, sig):
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives.asymmetric import ec
 
-        def sign(self, msg, key):
-            return key.sign(
+        try:
+            der_sig = raw_to_der_signature(sig, key.curve)
+        except ValueError:
+            return False
+
+        try:
+            key.verify(der_sig, msg, ec.ECDSA(self.hash_alg()))
+            return True
+        except InvalidSignature:
+            return False
+
+
+class RSAPSSAlgorithm(RSAAlgorithm):
+    """
+    Performs a signature using RSASSA-PSS with MGF1
+    """
+
+    def sign(self, msg, key):
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        return key.sign(
+            msg,
+            padding.PSS(
+                mgf=padding.MGF1(self.hash_alg()),
+                salt_length=self.hash_alg.digest_size
+            ),
+            self.hash_alg()
+        )
+
+    def verify(self, msg, key, sig):
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        try:
+            key.verify(
+                sig,
                 msg,
                 padding.PSS(
                     mgf=padding.MGF1(self.hash_alg()),
@@ -386,18 +610,6 @@ if has_crypto:
                 ),
                 self.hash_alg()
             )
-
-        def verify(self, msg, key, sig):
-            try:
-                key.verify(
-                    sig,
-                    msg,
-                    padding.PSS(
-                        mgf=padding.MGF1(self.hash_alg()),
-                        salt_length=self.hash_alg.digest_size
-                    ),
-                    self.hash_alg()
-                )
-                return True
-            except InvalidSignature:
-                return False
+            return True
+        except InvalidSignature:
+            return False
@@ -1,12 +1,12 @@
 import binascii
 import json
 import warnings
-from collections import Mapping
 
 from .algorithms import (
-    Algorithm, get_default_algorithms, has_crypto, requires_cryptography  # NOQA
+    KEY_CACHE_SIZE, Algorithm, PreparedKeyCache, get_default_algorithms,  # NOQA
+    has_crypto, requires_cryptography
 )
-from .compat import binary_type, string_types, text_type
+from .compat import Mapping, binary_type, string_types, text_type
 from .exceptions import (
     DecodeError, InvalidAlgorithmError, InvalidSignatureError,
     InvalidTokenError
@@ -17,8 +17,10 @@ from .utils import base64url_decode, base64url_encode, force_bytes, merge_dict
 class PyJWS(object):
     header_typ = 'JWT'
 
-    def __init__(self, algorithms=None, options=None):
+    def __init__(self, algorithms=None, options=None,
+                 key_cache_size=KEY_CACHE_SIZE):
         self._algorithms = get_default_algorithms()
+        self._key_cache = PreparedKeyCache(key_cache_size)
         self._valid_algs = (set(algorithms) if algorithms is not None
                             else set(self._algorithms))
 
@@ -50,6 +52,7 @@ class PyJWS(object):
 
         self._algorithms[alg_id] = alg_obj
         self._valid_algs.add(alg_id)
+        self._key_cache.discard(alg_id)
 
     def unregister_algorithm(self, alg_id):
         """
@@ -62,6 +65,7 @@ class PyJWS(object):
 
         del self._algorithms[alg_id]
         self._valid_algs.remove(alg_id)
+        self._key_cache.discard(alg_id)
 
     def get_algorithms(self):
         """
@@ -69,6 +73,16 @@ class PyJWS(object):
         """
         return list(self._valid_algs)
 
+    def get_key_cache_stats(self):
+        """
+        Returns the statistics of the prepared key cache as a dict(): hits,
+        misses, evictions, size and maxsize. See PreparedKeyCache.
+        """
+        return self._key_cache.stats()
+
+    def clear_key_cache(self):
+        self._key_cache.clear()
+
     def encode(self, payload, key, algorithm='HS256', headers=None,
                json_encoder=None):
         segments = []
@@ -101,11 +115,13 @@ class PyJWS(object):
         signing_input = b'.'.join(segments)
         try:
             alg_obj = self._algorithms[algorithm]
-            key = alg_obj.prepare_key(key)
+            key = self._key_cache.prepare(algorithm, alg_obj, key)
             signature = alg_obj.sign(signing_input, key)
 
         except KeyError:
-            if not has_crypto and algorithm in requires_cryptography:
+            # Registered, but cryptography failed to import on first use.
+            broken_crypto = algorithm in self._algorithms
+            if algorithm in requires_cryptography and (not has_crypto or broken_crypto):
                 raise NotImplementedError(
                     "Algorithm '%s' could not be found. Do you have cryptography "
                     "installed?" % algorithm
@@ -203,7 +219,7 @@ class PyJWS(object):
 
         try:
             alg_obj = self._algorithms[alg]
-            key = alg_obj.prepare_key(key)
+            key = self._key_cache.prepare(alg, alg_obj, key)
 
             if not alg_obj.verify(signing_input, key, signature):
                 raise InvalidSignatureError('Signature verification failed')
@@ -226,3 +242,5 @@ decode = _jws_global_obj.decode
 register_algorithm = _jws_global_obj.register_algorithm
 unregister_algorithm = _jws_global_obj.unregister_algorithm
 get_unverified_header = _jws_global_obj.get_unverified_header
+get_key_cache_stats = _jws_global_obj.get_key_cache_stats
+clear_key_cache = _jws_global_obj.clear_key_cache
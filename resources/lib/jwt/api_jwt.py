@@ -1,18 +1,18 @@
+import binascii
 import json
 import warnings
 from calendar import timegm
-from collections import Iterable, Mapping
 from datetime import datetime, timedelta
 
 from .api_jws import PyJWS
 from .algorithms import Algorithm, get_default_algorithms  # NOQA
-from .compat import string_types
+from .compat import Iterable, Mapping, binary_type, string_types, text_type
 from .exceptions import (
     DecodeError, ExpiredSignatureError, ImmatureSignatureError,
     InvalidAudienceError, InvalidIssuedAtError,
     InvalidIssuerError, MissingRequiredClaimError
 )
-from .utils import merge_dict
+from .utils import base64url_decode, merge_dict
 
 
 class PyJWT(PyJWS):
@@ -90,6 +90,38 @@ class PyJWT(PyJWS):
 
         return payload
 
+    def decode_unverified_claims(self, jwt):
+        """Returns back the JWT claims as a dict()
+
+        Only the payload segment is decoded, once. The header and signature
+        segments are not decoded, and neither the signature nor the claims
+        are verified. So the claims should not be trusted, use decode() for
+        that.
+        """
+        if isinstance(jwt, text_type):
+            jwt = jwt.encode('utf-8')
+
+        if not issubclass(type(jwt), binary_type):
+            raise DecodeError("Invalid token type. Token must be a {0}".format(
+                binary_type))
+
+        try:
+            signing_input, crypto_segment = jwt.rsplit(b'.', 1)
+            header_segment, payload_segment = signing_input.split(b'.', 1)
+        except ValueError:
+            raise DecodeError('Not enough segments')
+
+        try:
+            payload = json.loads(base64url_decode(payload_segment).decode('utf-8'))
+        except (TypeError, binascii.Error):
+            raise DecodeError('Invalid payload padding')
+        except ValueError as e:
+            raise DecodeError('Invalid payload string: %s' % e)
+        if not isinstance(payload, Mapping):
+            raise DecodeError('Invalid payload string: must be a json object')
+
+        return payload
+
     def _validate_claims(self, payload, options, audience=None, issuer=None,
                          leeway=0, **kwargs):
 
@@ -205,3 +237,6 @@ decode = _jwt_global_obj.decode
 register_algorithm = _jwt_global_obj.register_algorithm
 unregister_algorithm = _jwt_global_obj.unregister_algorithm
 get_unverified_header = _jwt_global_obj.get_unverified_header
+decode_unverified_claims = _jwt_global_obj.decode_unverified_claims
+get_key_cache_stats = _jwt_global_obj.get_key_cache_stats
+clear_key_cache = _jwt_global_obj.clear_key_cache
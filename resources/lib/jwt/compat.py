@@ -20,6 +20,12 @@ else:
 
 string_types = (text_type, binary_type)
 
+try:
+    # Importing ABCs from collections was removed in Python 3.10
+    from collections.abc import Iterable, Mapping
+except ImportError:
+    from collections import Iterable, Mapping
+
 
 try:
     constant_time_compare = hmac.compare_digest
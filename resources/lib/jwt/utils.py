@@ -4,13 +4,6 @@ import struct
 
 from .compat import binary_type, bytes_from_int, text_type
 
-try:
-    from cryptography.hazmat.primitives.asymmetric.utils import (
-        decode_dss_signature, encode_dss_signature
-    )
-except ImportError:
-    pass
-
 
 def force_unicode(value):
     if isinstance(value, binary_type):
@@ -92,6 +85,11 @@ def bytes_to_number(string):
 
 
 def der_to_raw_signature(der_sig, curve):
+    # Only used by the EC algorithms, cryptography is imported with them.
+    from cryptography.hazmat.primitives.asymmetric.utils import (
+        decode_dss_signature
+    )
+
     num_bits = curve.key_size
     num_bytes = (num_bits + 7) // 8
 
@@ -101,6 +99,10 @@ def der_to_raw_signature(der_sig, curve):
 
 
 def raw_to_der_signature(raw_sig, curve):
+    from cryptography.hazmat.primitives.asymmetric.utils import (
+        encode_dss_signature
+    )
+
     num_bits = curve.key_size
     num_bytes = (num_bits + 7) // 8
 
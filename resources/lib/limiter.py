@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side rate limit of the requests that make medusa do work (web routes and api v1).
+
+A token bucket limits the rate, and requests waiting for a token are served by priority: a click on a single
+episode goes ahead of batches, replayed searches and the polling of the search status. The limiter is shared by
+all MedusaApi instances in the process, like the transport's connection pool.
+"""
+
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# Defaults of the rate_limit (requests per second) and rate_burst settings.
+DEFAULT_RATE = 5
+DEFAULT_BURST = 10
+
+_local = threading.local()
+
+
+class TokenBucket(object):
+    """Allow `rate` requests per second on average, and bursts of up to `burst` requests."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time()
+
+    def take(self):
+        """Take a token. Returns 0 when it got one, otherwise the seconds until the next token is available."""
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class Scheduler(object):
+    """Hand out the bucket's tokens to the waiting requests, highest priority (lowest number) first."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.condition = threading.Condition()
+        self.bucket = TokenBucket(rate, burst)
+        self.waiting = []
+        self.tickets = itertools.count()
+
+    def configure(self, rate, burst):
+        with self.condition:
+            if (self.bucket.rate, self.bucket.burst) != (float(rate), burst):
+                self.bucket = TokenBucket(rate, burst)
+                self.condition.notify_all()
+
+    def acquire(self, priority=None):
+        """Wait for a token. Returns the seconds spent waiting."""
+        start = time.time()
+        ticket = (current_priority() if priority is None else priority, next(self.tickets))
+        with self.condition:
+            heapq.heappush(self.waiting, ticket)
+            while True:
+                if self.waiting[0] == ticket:
+                    delay = self.bucket.take()
+                    if not delay:
+                        heapq.heappop(self.waiting)
+                        # Let the next in line check the bucket.
+                        self.condition.notify_all()
+                        break
+                    self.condition.wait(delay)
+                else:
+                    self.condition.wait()
+        return time.time() - start
+
+    def queued(self):
+        with self.condition:
+            return len(self.waiting)
+
+
+scheduler = Scheduler()
+
+
+def configure(rate, burst):
+    scheduler.configure(rate, burst)
+
+
+def acquire():
+    return scheduler.acquire()
+
+
+def current_priority():
+    return getattr(_local, 'priority', INTERACTIVE)
+
+
+@contextlib.contextmanager
+def priority(level):
+    """Run the requests made in the block, on this thread, with the given priority."""
+    previous = current_priority()
+    _local.priority = level
+    try:
+        yield
+    finally:
+        _local.priority = previous
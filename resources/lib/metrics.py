@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Per-phase timings of every click, appended to a rolling metrics file in the addon's profile.
+
+A click creates a `Record`, and activates it on the threads doing its work. The code doing the work only uses the
+module level `span` and `count` helpers, which are no-ops when no record is active.
+"""
+
+import contextlib
+import json
+import threading
+import time
+
+import xbmc
+
+from resources.lib.cache import atomic_write, profile_path
+
+METRICS_FILE = 'metrics.jsonl'
+# Number of records kept in the metrics file.
+KEEP_RECORDS = 500
+# Upper bounds (in ms) of the buckets of the summary's histograms.
+BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class Record(object):
+    """The timings of one click."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.start = time.time()
+        self.phases = {}
+        self.counters = {}
+        self.info = {}
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def add_phase(self, name, duration):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0) + duration
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_info(self, name, value):
+        self.info[name] = value
+
+    def finish(self):
+        """Append the record to the metrics file. Only the first call writes it."""
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+
+        append({
+            'time': int(self.start),
+            'kind': self.kind,
+            'total': round((time.time() - self.start) * 1000, 1),
+            'phases': dict((name, round(duration * 1000, 1)) for name, duration in self.phases.items()),
+            'counters': self.counters,
+            'info': self.info,
+        })
+
+
+def current():
+    return getattr(_local, 'record', None)
+
+
+@contextlib.contextmanager
+def activate(record):
+    """Make the record the current record of this thread."""
+    previous = current()
+    _local.record = record
+    try:
+        yield record
+    finally:
+        _local.record = previous
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time the block as phase `name` of the current record."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        record = current()
+        if record is not None:
+            record.add_phase(name, time.time() - start)
+
+
+def bind(func):
+    """Wrap func, so it runs with the current record active. For work handed to another thread."""
+    record = current()
+
+    def bound(*args, **kwargs):
+        with activate(record):
+            return func(*args, **kwargs)
+    return bound
+
+
+def count(name, value=1):
+    """Increment counter `name` of the current record."""
+    record = current()
+    if record is not None:
+        record.count(name, value)
+
+
+def set_info(name, value):
+    record = current()
+    if record is not None:
+        record.set_info(name, value)
+
+
+def append(entry, path=None):
+    """Append an entry to the metrics file, and drop the oldest entries once there are too many."""
+    path = path or profile_path(METRICS_FILE)
+    with _lock:
+        try:
+            with open(path, 'a') as fp:
+                fp.write(json.dumps(entry) + '\n')
+
+            # Only rewrite the file once it has grown to twice the size we keep.
+            with open(path, 'r') as fp:
+                lines = fp.readlines()
+            if len(lines) >= KEEP_RECORDS * 2:
+                atomic_write(path, ''.join(lines[-KEEP_RECORDS:]))
+        except (IOError, OSError) as error:
+            xbmc.log('Failed writing metrics to {0}: {1}'.format(path, error), xbmc.LOGWARNING)
+
+
+def read(path=None, last=None):
+    """Return the entries of the metrics file, oldest first."""
+    path = path or profile_path(METRICS_FILE)
+    entries = []
+    try:
+        with open(path, 'r') as fp:
+            for line in fp:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A line that was only partially written.
+                    continue
+    except (IOError, OSError):
+        return []
+    return entries[-last:] if last else entries
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def _histogram(values, width=30):
+    counts = [0] * (len(BUCKETS) + 1)
+    for value in values:
+        counts[len([bound for bound in BUCKETS if value > bound])] += 1
+
+    lines = []
+    lower_bounds = (0,) + BUCKETS
+    for index, bucket_count in enumerate(counts):
+        if index < len(BUCKETS):
+            label = '{0}-{1} ms'.format(lower_bounds[index], BUCKETS[index])
+        else:
+            label = '>{0} ms'.format(BUCKETS[-1])
+        bar = '#' * int(round(bucket_count * width / float(max(counts))))
+        lines.append('  {0:>14} {1:>4} {2}'.format(label, bucket_count, bar))
+    return lines
+
+
+def summary(last=100, path=None):
+    """Return a text summary of the last records: a latency histogram for the total and every phase."""
+    entries = read(path, last)
+    if not entries:
+        return 'No metrics recorded yet.'
+
+    phases = {'total': [entry['total'] for entry in entries]}
+    counters = {}
+    for entry in entries:
+        for name, duration in entry.get('phases', {}).items():
+            phases.setdefault(name, []).append(duration)
+        for name, value in entry.get('counters', {}).items():
+            counters[name] = counters.get(name, 0) + value
+
+    lines = ['Last {0} clicks'.format(len(entries))]
+    for name in ['total'] + sorted(name for name in phases if name != 'total'):
+        durations = phases[name]
+        lines.append('')
+        lines.append('{name}: {count} times, p50 {p50:.0f} ms, p95 {p95:.0f} ms, max {max:.0f} ms'.format(
+            name=name, count=len(durations), p50=_percentile(durations, 50), p95=_percentile(durations, 95),
+            max=max(durations)
+        ))
+        lines.extend(_histogram(durations))
+
+    saved = counters.get('searches_saved', 0)
+    if saved:
+        lines.append('')
+        lines.append('Searches: {started} started, {saved} clicks attached to a search in flight ({percent:.0f}% '
+                     'of the search load saved)'.format(
+                         started=counters.get('searches_started', 0), saved=saved,
+                         percent=saved * 100.0 / (saved + counters.get('searches_started', 0))
+                     ))
+
+    if counters:
+        lines.append('')
+        lines.append('Counters: ' + ', '.join(
+            '{0}: {1}'.format(name, value) for name, value in sorted(counters.items())
+        ))
+    return '\n'.join(lines)
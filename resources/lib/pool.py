@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""A small bounded thread pool, as Kodi's python 2 doesn't ship concurrent.futures."""
+
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class Future(object):
+    """The result of a call submitted to the WorkerPool."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def set_result(self, value):
+        self._value = value
+        self._finish()
+
+    def set_error(self, error):
+        self._error = error
+        self._finish()
+
+    def add_done_callback(self, callback):
+        """Call callback(future) once the call finished, right away when it already did."""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait until the call finished. Returns False when the timeout expired first."""
+        return self._done.wait(timeout)
+
+    def error(self):
+        """Return the exception raised by the call, or None. Waits for the call to finish."""
+        self._done.wait()
+        return self._error
+
+    def result(self):
+        """Return the result of the call, or raise its exception. Waits for the call to finish."""
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+def spawn(func, *args, **kwargs):
+    """
+    Run a call on a new (daemon) thread, and return its Future.
+
+    For calls that run alongside the caller's own work, and may use a WorkerPool themselves, so they can't wait for
+    one of its threads.
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as error:
+            future.set_error(error)
+
+    thread = threading.Thread(target=run, name='medusa-task')
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def first(futures, accept=bool):
+    """
+    Wait for the first of the futures to finish with a result that's accepted.
+
+    Futures are checked in the order they finish, so this waits about as long as the fastest call with an accepted
+    result, not for all of them. Calls that raised are skipped.
+
+    :return: A tuple of (index, result), or (None, None) when none of the results was accepted.
+    """
+    finished = queue.Queue()
+    for index, future in enumerate(futures):
+        future.add_done_callback(lambda future, index=index: finished.put(index))
+
+    for _ in futures:
+        index = finished.get()
+        if futures[index].error() is None and accept(futures[index].result()):
+            return index, futures[index].result()
+    return None, None
+
+
+class WorkerPool(object):
+    """
+    Run calls on at most `workers` threads.
+
+    The threads are started when needed, and are daemon threads so an idle pool never keeps Kodi from exiting.
+    """
+
+    def __init__(self, workers, name='medusa-worker'):
+        self.workers = max(1, int(workers))
+        self.name = name
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.threads = []
+        self.idle = 0
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        with self.lock:
+            self.queue.put((future, func, args, kwargs))
+            if not self.idle and len(self.threads) < self.workers:
+                thread = threading.Thread(target=self._work, name='{0}-{1}'.format(self.name, len(self.threads)))
+                thread.daemon = True
+                self.threads.append(thread)
+                thread.start()
+            else:
+                self.idle = max(0, self.idle - 1)
+        return future
+
+    def map(self, func, items):
+        """Submit func for every item. Returns the futures, in the order of the items."""
+        return [self.submit(func, item) for item in items]
+
+    def _work(self):
+        while True:
+            future, func, args, kwargs = self.queue.get()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as error:
+                future.set_error(error)
+            finally:
+                with self.lock:
+                    self.idle += 1
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Resolve the unique ids (tvdb, tmdb, tvmaze, imdb) of the show a ListItem belongs to."""
+
+import json
+import threading
+
+import xbmc
+
+# The unique ids kodi's scrapers set, that medusa knows about as well.
+INDEXERS = ('tvdb', 'tmdb', 'tvmaze', 'imdb')
+# Properties which plugins and skins commonly set on episode ListItems, holding the show's id of an indexer.
+SHOW_ID_PROPERTIES = ('tvshow.{0}_id', 'tvshow.{0}', 'tvshow.uniqueid.{0}')
+
+# The sources a lookup can use, from fast to slow. A lookup reports the sources of its steps, for example
+# 'listitem+jsonrpc' when the show's dbid came from the ListItem and its unique ids from a json-rpc call.
+SOURCE_LISTITEM = 'listitem'
+SOURCE_CACHE = 'cache'
+SOURCE_JSONRPC = 'jsonrpc'
+# The show was found in the series index, which skips the lookup of the unique ids and medusa's series.
+SOURCE_INDEX = 'index'
+
+# Number of shows requested per VideoLibrary.GetTVShows call.
+LIBRARY_PAGE_SIZE = 500
+
+
+def json_rpc(method, params):
+    """Execute a request on kodi's json-rpc api, and return the decoded response."""
+    json_data = {
+        "jsonrpc": "2.0", "id": 1, "method": method, "params": params
+    }
+    response = xbmc.executeJSONRPC(json.dumps(json_data))
+    return json.loads(response.decode('utf-8', 'replace'))
+
+
+def unique_ids(uniqueid=None, imdbnumber=None):
+    """
+    Normalize a show's unique ids to a dict of indexer -> id, with only the indexers in `INDEXERS`.
+
+    Shows without unique ids (older kodi versions) only have imdbnumber, which holds the id of the show's scraper.
+    That's an imdb id when it looks like one, and a tvdb id otherwise (kodi's default tv scraper used to be tvdb).
+    """
+    ids = dict(
+        (indexer, '{0}'.format(value)) for indexer, value in (uniqueid or {}).items() if indexer in INDEXERS and value
+    )
+    if not ids and imdbnumber:
+        imdbnumber = '{0}'.format(imdbnumber)
+        ids['imdb' if imdbnumber.startswith('tt') else 'tvdb'] = imdbnumber
+    return ids
+
+
+def list_item_ids(list_item, info_tag):
+    """
+    Collect the ids of the show the ListItem belongs to, that are available without a json-rpc call.
+
+    :return: A tuple of (the show's kodi dbid or None, the show's unique ids or None).
+    """
+    tvshow_db_id = None
+    show_ids = {}
+    media_type = info_tag.getMediaType()
+
+    if media_type == 'tvshow':
+        tvshow_db_id = info_tag.getDbId()
+        # The show's own unique ids. Kodi stores the scraper's id in imdbnumber.
+        if hasattr(list_item, 'getUniqueID'):
+            show_ids = dict((indexer, list_item.getUniqueID(indexer)) for indexer in INDEXERS)
+        show_ids = unique_ids(show_ids, info_tag.getIMDBNumber())
+    else:
+        # Only available since Kodi 19.
+        tvshow_db_id = xbmc.getInfoLabel('ListItem.TvShowDBID')
+        for indexer in INDEXERS:
+            for name in SHOW_ID_PROPERTIES:
+                value = list_item.getProperty(name.format(indexer))
+                if value:
+                    show_ids[indexer] = value
+                    break
+
+    return int(tvshow_db_id) if tvshow_db_id and int(tvshow_db_id) > 0 else None, show_ids or None
+
+
+def library_tvshows(page_size=LIBRARY_PAGE_SIZE):
+    """Yield (show dbid, unique ids, title) for every show in kodi's library, a page at a time."""
+    start = 0
+    while True:
+        json_response = json_rpc('VideoLibrary.GetTVShows', {
+            "properties": ["title", "uniqueid", "imdbnumber"], "limits": {"start": start, "end": start + page_size}
+        })
+        result = json_response.get('result') or {}
+        tvshows = result.get('tvshows', [])
+        for tvshow in tvshows:
+            yield tvshow['tvshowid'], unique_ids(tvshow.get('uniqueid'), tvshow.get('imdbnumber')), tvshow.get('title')
+
+        start += len(tvshows)
+        if not tvshows or start >= result.get('limits', {}).get('total', 0):
+            return
+
+
+class SeriesResolver(object):
+    """
+    Resolve kodi's episode dbid -> kodi's show dbid -> the show's unique ids.
+
+    The ids collected from the ListItem are tried first, then the library cache. Only the missing steps are done
+    through json-rpc, and their results are added to the cache. When an episode's show is looked up, the show's
+    other episodes are added to the cache as well.
+    """
+
+    # The shows whose episodes are being cached, so concurrent clicks on a show only cache them once.
+    CACHING_LOCK = threading.Lock()
+    caching = set()
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    def resolve(self, item):
+        """
+        Resolve the unique ids of the item's show.
+
+        :param item: The ListItem's info as collected by `ipc.list_item_info`.
+        :return: A tuple of (the unique ids or None, the sources used to resolve them).
+        """
+        if item.get('show_ids'):
+            return item['show_ids'], SOURCE_LISTITEM
+
+        sources = []
+        tvshow_db_id = item.get('tvshow_dbid')
+        if tvshow_db_id:
+            sources.append(SOURCE_LISTITEM)
+        else:
+            tvshow_db_id, source = self.episode_tvshow_db_id(item['dbid'])
+            sources.append(source)
+
+        show_ids, source = self.tvshow_unique_ids(tvshow_db_id)
+        if source not in sources:
+            sources.append(source)
+
+        return show_ids, '+'.join(sources)
+
+    def episode_tvshow_db_id(self, episode_db_id):
+        """Return a tuple of (the episode's show dbid, source)."""
+        if self.cache:
+            tvshow_db_id = self.cache.get_tvshow_db_id(episode_db_id)
+            if tvshow_db_id is not None:
+                return tvshow_db_id, SOURCE_CACHE
+
+        # Get episode details
+        json_response = json_rpc('VideoLibrary.GetEpisodeDetails', {
+            "episodeid": int(episode_db_id), "properties": ["tvshowid"]
+        })
+        tvshow_db_id = json_response['result']['episodedetails']['tvshowid']
+
+        if self.cache:
+            self.cache.set_tvshow_db_id(episode_db_id, tvshow_db_id)
+            # The show's other episodes are likely clicked next, cache them all with one more call.
+            self.cache_episodes_later(tvshow_db_id)
+        return tvshow_db_id, SOURCE_JSONRPC
+
+    def cache_episodes(self, tvshow_db_id):
+        """Add all episodes of the show to the cache, with a single VideoLibrary.GetEpisodes call."""
+        json_response = json_rpc('VideoLibrary.GetEpisodes', {"tvshowid": int(tvshow_db_id)})
+        episodes = (json_response.get('result') or {}).get('episodes', [])
+        self.cache.set_tvshow_episodes(tvshow_db_id, [episode['episodeid'] for episode in episodes])
+
+    def cache_episodes_later(self, tvshow_db_id):
+        """Cache the show's episodes on a thread of its own, so the click doesn't wait for it."""
+        with SeriesResolver.CACHING_LOCK:
+            if tvshow_db_id in SeriesResolver.caching:
+                return None
+            SeriesResolver.caching.add(tvshow_db_id)
+
+        def cache():
+            try:
+                self.cache_episodes(tvshow_db_id)
+            except Exception as error:
+                xbmc.log('Failed caching the episodes of show {0}, error: {1}'.format(tvshow_db_id, error),
+                         xbmc.LOGWARNING)
+            finally:
+                with SeriesResolver.CACHING_LOCK:
+                    SeriesResolver.caching.discard(tvshow_db_id)
+
+        # Not a daemon, so an invocation without the service finishes caching before it exits.
+        thread = threading.Thread(target=cache, name='medusa-library-episodes')
+        thread.start()
+        return thread
+
+    def tvshow_unique_ids(self, tvshow_db_id):
+        """Return a tuple of (the show's unique ids or None, source)."""
+        if self.cache:
+            show_ids = self.cache.get_unique_ids(tvshow_db_id)
+            if show_ids is not None:
+                return show_ids, SOURCE_CACHE
+
+        # Get show details
+        json_response = json_rpc('VideoLibrary.GetTVShowDetails', {
+            "tvshowid": tvshow_db_id, "properties": ["uniqueid", "imdbnumber"]
+        })
+
+        show_ids = None
+        if json_response.get('result'):
+            details = json_response['result']['tvshowdetails']
+            show_ids = unique_ids(details.get('uniqueid'), details.get('imdbnumber')) or None
+
+        if self.cache and show_ids:
+            self.cache.set_unique_ids(tvshow_db_id, show_ids)
+        return show_ids, SOURCE_JSONRPC
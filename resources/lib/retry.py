@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""The retry policy used by the transport's adapter. Imports urllib3, so it's only imported with requests."""
+
+import random
+
+from requests.packages.urllib3.util.retry import Retry
+
+from resources.lib.transport import NOT_IDEMPOTENT
+
+
+class JitteredRetry(Retry):
+    """Retry with a randomized backoff, so parallel requests don't all retry at the same moment."""
+
+    def get_backoff_time(self):
+        backoff = super(JitteredRetry, self).get_backoff_time()
+        return random.uniform(backoff / 2, backoff)
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        retry = self
+        if url and url.split('?')[0].endswith(NOT_IDEMPOTENT) and not (error and self._is_connection_error(error)):
+            # Exhaust the retries, so this raises instead of retrying.
+            retry = self.new(read=0, status=0)
+        return super(JitteredRetry, retry).increment(method, url, response, error, *args, **kwargs)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Long running service, which keeps Medusa's http sessions, token and caches warm in memory.
+
+Context menu clicks are handed over by main.py through `ipc`, so a click doesn't have to import requests, open new
+connections or authenticate again.
+"""
+
+import threading
+import time
+
+import xbmc
+import xbmcaddon
+
+from resources.lib import breaker, context, endpoints, journal
+from resources.lib.cache import LibraryCache, SeriesIndex, profile_path
+from resources.lib.ipc import ServiceServer
+
+ADDON_ID = 'context.medusa.failed'
+# Seconds between refreshes of the series index, besides the ones after a library scan.
+INDEX_REFRESH_INTERVAL = 3600
+
+
+class MedusaService(xbmc.Monitor):
+    """Serve the clicks handed over by main.py, until Kodi shuts down."""
+
+    def __init__(self):
+        super(MedusaService, self).__init__()
+        self.lock = threading.Lock()
+        self.failed = None
+        self.server = None
+        self.replayer = None
+        self.library_cache = LibraryCache(profile_path('library.db'))
+        self.series_index = SeriesIndex(profile_path('library.db'))
+        self.index_refreshed = 0
+        self.endpoints_checked = 0
+
+    def onNotification(self, sender, method, data):
+        if method.startswith('VideoLibrary.'):
+            self.library_cache.on_notification(method, data)
+            self.series_index.on_notification(method, data)
+        if method == 'VideoLibrary.OnScanFinished':
+            self.refresh_index()
+
+    def onSettingsChanged(self):
+        # Build a new MedusaFailed with the new settings on the next click.
+        with self.lock:
+            self.failed = None
+        self.endpoints_checked = 0
+        self.warm_up()
+
+    def get_failed(self):
+        """Return the (cached) MedusaFailed instance. Returns None when the addon isn't configured yet."""
+        with self.lock:
+            if self.failed is None:
+                settings = xbmcaddon.Addon(ADDON_ID)
+                if not settings.getSetting('medusaurl'):
+                    return None
+                self.failed = context.MedusaFailed(context.MySettings.from_addon(settings))
+            return self.failed
+
+    def warm_up(self):
+        """Open the connections and authenticate in the background, before the first click comes in."""
+        def authenticate():
+            failed = self.get_failed()
+            if failed is not None:
+                failed.authenticate()
+                self._refresh_index(failed)
+
+        warm_up = threading.Thread(target=authenticate, name='medusa-warm-up')
+        warm_up.daemon = True
+        warm_up.start()
+
+    def refresh_index(self):
+        """Refresh the series index in the background."""
+        failed = self.get_failed()
+        if failed is None:
+            return
+
+        refresh = threading.Thread(target=self._refresh_index, args=(failed,), name='medusa-index-refresh')
+        refresh.daemon = True
+        refresh.start()
+
+    def _refresh_index(self, failed):
+        self.index_refreshed = time.time()
+        try:
+            failed.refresh_index()
+        except Exception as error:
+            xbmc.log('Failed refreshing the series index: {0}'.format(error), xbmc.LOGWARNING)
+
+    def check_endpoints(self):
+        """Check the endpoints of the medusa instances that have more than one, in the background."""
+        self.endpoints_checked = time.time()
+        failed = self.get_failed()
+        if failed is None:
+            return
+
+        def check():
+            for medusa in failed.instances:
+                try:
+                    medusa.check_endpoints()
+                except Exception as error:
+                    xbmc.log('Failed checking the endpoints of {0}: {1}'.format(medusa.url, error), xbmc.LOGWARNING)
+
+        check_thread = threading.Thread(target=check, name='medusa-endpoint-checks')
+        check_thread.daemon = True
+        check_thread.start()
+
+    def probe(self):
+        """Probe the instances whose circuit is open and due for a check, in the background. See the breaker module."""
+        failed = self.get_failed()
+        if failed is None:
+            return
+
+        for medusa in failed.instances:
+            if medusa.breaker.state() == breaker.CLOSED or medusa.breaker.retry_in():
+                continue
+            probe = threading.Thread(target=medusa.probe, name='medusa-probe')
+            probe.daemon = True
+            probe.start()
+
+    def handle(self, item):
+        start = time.time()
+        failed = self.get_failed()
+        if failed is None:
+            context.dialog_notification('Configure the url to medusa first', icon=context.xbmcgui.NOTIFICATION_WARNING)
+            return
+
+        failed.run(item)
+        xbmc.log('Medusa service handled click in {0:.0f} ms'.format((time.time() - start) * 1000), xbmc.LOGDEBUG)
+
+    def run(self):
+        self.server = ServiceServer(self.handle)
+        self.server.start()
+        self.replayer = journal.Replayer(self.get_failed)
+        self.replayer.start()
+        self.warm_up()
+
+        while not self.waitForAbort(10):
+            self.probe()
+            if time.time() - self.endpoints_checked > endpoints.CHECK_INTERVAL:
+                self.check_endpoints()
+            if time.time() - self.index_refreshed > INDEX_REFRESH_INTERVAL:
+                self.refresh_index()
+
+        self.replayer.stop()
+        self.server.stop()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Measure how long importing each module takes, to keep an eye on the cold start of main.py."""
+
+import sys
+import time
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+import xbmc
+
+
+class ImportTimer(object):
+    """
+    Wrap the builtin __import__, and record how long the first import of every module took.
+
+    The times are inclusive: importing requests includes the time spent importing urllib3.
+    """
+
+    def __init__(self):
+        self.start = time.time()
+        self.times = {}
+        self.original_import = None
+
+    def install(self):
+        if self.original_import is not None:
+            return
+        self.original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def _import(self, name, *args, **kwargs):
+        level = kwargs.get('level', args[3] if len(args) > 3 else 0)
+        key = '.' * level + name if level > 0 else name
+        if key in sys.modules or key in self.times:
+            return self.original_import(name, *args, **kwargs)
+
+        start = time.time()
+        try:
+            return self.original_import(name, *args, **kwargs)
+        finally:
+            self.times[key] = time.time() - start
+
+    def report(self, limit=15):
+        """Log the slowest imports, and the total time since the timer was created."""
+        self.uninstall()
+        slowest = sorted(self.times.items(), key=lambda item: item[1], reverse=True)[:limit]
+        lines = ['{0:>8.1f} ms  {1}'.format(duration * 1000, name) for name, duration in slowest]
+        xbmc.log('Startup took {total:.1f} ms, slowest imports:\n{imports}'.format(
+            total=(time.time() - self.start) * 1000, imports='\n'.join(lines)
+        ), xbmc.LOGINFO)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+The http transport shared by all of MedusaApi's sessions.
+
+All sessions use the same HTTPAdapter, so they share one keep-alive connection pool per host, and the same retry
+policy. Timeouts are configured per endpoint.
+"""
+
+import threading
+
+# Number of hosts to keep a pool for, and the number of connections kept alive per host. This should at least fit
+# the largest batch (see the batch_workers setting), plus the search status polling and token refresh.
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+RETRIES = 3
+BACKOFF_FACTOR = 0.3
+RETRY_STATUS = (502, 503, 504)
+
+# Requests which start something in medusa. Retrying them after they reached medusa could start a search twice,
+# so they're only retried when the connection couldn't be made.
+NOT_IDEMPOTENT = ('home/retryEpisode', 'home/searchEpisode')
+
+_adapter = None
+_lock = threading.RLock()
+
+# (connect, read) timeouts in seconds, per endpoint. The longest matching path prefix is used.
+DEFAULT_TIMEOUT = (3.05, 60)
+TIMEOUTS = {
+    'api/v2/authenticate': (3.05, 15),
+    'api/v2/series': (3.05, 15),
+    'login': (3.05, 15),
+    'home/retryEpisode': (3.05, 30),
+    'home/searchEpisode': (3.05, 30),
+    'home/getManualSearchStatus': (3.05, 10),
+    # The forced search call in api v1 is synchronous. So on large providers lists we need to wait a certain time,
+    # to get back results.
+    'api/v1': (3.05, 600),
+}
+
+
+def timeout(path):
+    """Return the (connect, read) timeout for a path relative to medusa's url, like 'api/v2/series/tvdb1234'."""
+    matches = [prefix for prefix in TIMEOUTS if path.startswith(prefix)]
+    return TIMEOUTS[max(matches, key=len)] if matches else DEFAULT_TIMEOUT
+
+
+def unreachable(error):
+    """
+    Whether a request failed because medusa couldn't be reached (or is restarting), rather than medusa refusing it.
+
+    Those requests are worth trying again later, see the journal module.
+    """
+    from requests.exceptions import ConnectionError, HTTPError, Timeout
+
+    if isinstance(error, HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUS
+    return isinstance(error, (ConnectionError, Timeout))
+
+
+def connect_failed(error):
+    """
+    Whether a request failed because the connection to medusa couldn't be made, so it never reached medusa.
+
+    Those requests can be sent to another endpoint of the same medusa, also when they aren't idempotent.
+    """
+    from requests.exceptions import ConnectionError, ConnectTimeout
+    from requests.packages.urllib3.exceptions import NewConnectionError
+
+    if isinstance(error, ConnectTimeout):
+        return True
+    if not isinstance(error, ConnectionError) or not error.args:
+        return False
+    # requests wraps urllib3's MaxRetryError, which holds the error of the last attempt.
+    reason = getattr(error.args[0], 'reason', error.args[0])
+    return isinstance(reason, NewConnectionError)
+
+
+def _retry():
+    from resources.lib.retry import JitteredRetry
+
+    kwargs = {
+        'total': RETRIES,
+        'backoff_factor': BACKOFF_FACTOR,
+        'status_forcelist': RETRY_STATUS,
+        'raise_on_status': False,
+    }
+    # Only retry reads and bad statuses for idempotent requests. Connection errors are retried for all requests.
+    # urllib3 1.26 renamed method_whitelist to allowed_methods.
+    if hasattr(JitteredRetry, 'DEFAULT_ALLOWED_METHODS'):
+        kwargs['allowed_methods'] = frozenset(['GET', 'HEAD'])
+    else:
+        kwargs['method_whitelist'] = frozenset(['GET', 'HEAD'])
+    return JitteredRetry(**kwargs)
+
+
+def adapter():
+    """Return the adapter shared by all sessions. Requests is only imported the first time this is called."""
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            from requests.adapters import HTTPAdapter
+            _adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=_retry())
+        return _adapter
+
+
+def new_session():
+    """Return a new session, using the shared adapter."""
+    import requests
+
+    session = requests.Session()
+    session.mount('http://', adapter())
+    session.mount('https://', adapter())
+    return session
+
+
+class LazySession(object):
+    """
+    A class attribute holding a session, which is only created when it's first used.
+
+    This keeps requests from being imported, until a network call is actually made. Every medusa instance (by the
+    `url` of the object it's looked up on) gets its own session, so their cookies and api-keys don't mix.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+
+    def __get__(self, instance, owner):
+        key = getattr(instance, 'url', None)
+        with _lock:
+            if key not in self.sessions:
+                self.sessions[key] = new_session()
+            return self.sessions[key]
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+import os, sys
+import xbmc
+import xbmcaddon
+
+__addon__ = xbmcaddon.Addon('context.medusa.failed')
+__cwd__ = xbmc.translatePath(__addon__.getAddonInfo('path')).decode('utf-8')
+
+sys.path.append(os.path.join(__cwd__, 'resources', 'lib'))
+
+from resources.lib.service import MedusaService
+
+MedusaService().run()
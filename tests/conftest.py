@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Make the libraries vendored in resources/lib importable, like Kodi does for the addon.
+
+The addon's own modules import Kodi's modules, which are replaced by the stubs in benchmarks/stubs. The addon's
+profile is a temporary directory.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (os.path.join(ROOT, 'benchmarks', 'stubs'), ROOT, os.path.join(ROOT, 'resources', 'lib')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+if 'BENCH_PROFILE' not in os.environ:
+    os.environ['BENCH_PROFILE'] = tempfile.mkdtemp(prefix='medusa-tests-')
+    atexit.register(shutil.rmtree, os.environ['BENCH_PROFILE'], True)
+
+
+@pytest.fixture
+def window_properties():
+    """The properties of kodi's windows, cleared after the test."""
+    import xbmcgui
+
+    yield xbmcgui._properties
+    xbmcgui._properties.clear()
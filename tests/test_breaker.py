@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Tests of the circuit breaker of the requests to medusa."""
+
+import pytest
+
+from resources.lib import breaker
+from resources.lib.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from resources.lib.cache import JsonStore
+
+URL = 'http://medusa:8081/'
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def circuit(tmpdir, clock):
+    return CircuitBreaker(JsonStore(str(tmpdir.join('breaker.json'))), URL, threshold=3, reset_timeout=30)
+
+
+def test_opens_after_threshold_failures(circuit):
+    for _ in range(2):
+        circuit.record_failure()
+        assert circuit.state() == CLOSED
+        assert circuit.allow()
+
+    circuit.record_failure()
+    assert circuit.state() == OPEN
+    assert circuit.is_open()
+    assert not circuit.allow()
+
+
+def test_success_resets_the_failures(circuit):
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit.record_success()
+    circuit.record_failure()
+    circuit.record_failure()
+    assert circuit.state() == CLOSED
+
+
+def test_lets_a_single_probe_through_once_due(circuit, clock):
+    for _ in range(3):
+        circuit.record_failure()
+
+    clock.now += 29
+    assert not circuit.allow()
+    assert circuit.retry_in() == pytest.approx(1)
+
+    clock.now += 1
+    assert circuit.allow()
+    assert circuit.state() == HALF_OPEN
+    assert not circuit.allow()
+
+
+def test_probe_success_closes(circuit, clock):
+    for _ in range(3):
+        circuit.record_failure()
+    clock.now += 30
+    assert circuit.allow()
+
+    circuit.record_success()
+    assert circuit.state() == CLOSED
+    assert circuit.allow()
+
+
+def test_probe_failure_opens_again(circuit, clock):
+    for _ in range(3):
+        circuit.record_failure()
+    clock.now += 30
+    assert circuit.allow()
+
+    circuit.record_failure()
+    assert circuit.state() == OPEN
+    assert circuit.retry_in() == pytest.approx(30)
+
+
+def test_probe_that_never_reported_is_replaced(circuit, clock):
+    for _ in range(3):
+        circuit.record_failure()
+    clock.now += 30
+    assert circuit.allow()
+
+    clock.now += 30
+    assert circuit.allow()
+    assert circuit.state() == HALF_OPEN
+
+
+def test_state_is_shared_through_the_file(circuit, tmpdir):
+    for _ in range(3):
+        circuit.record_failure()
+
+    other = CircuitBreaker(JsonStore(str(tmpdir.join('breaker.json'))), URL)
+    assert other.is_open()
+    assert not CircuitBreaker(JsonStore(str(tmpdir.join('breaker.json'))), 'http://other:8081/').is_open()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Tests of the persistent caches in the addon's profile."""
+
+import os
+
+from resources.lib import cache
+from resources.lib.cache import JsonStore, LibraryCache, atomic_write
+
+
+def test_atomic_write_replaces_the_file(tmpdir):
+    path = str(tmpdir.join('file.json'))
+    atomic_write(path, 'old')
+    atomic_write(path, 'new', sync=True)
+    with open(path) as fp:
+        assert fp.read() == 'new'
+    assert os.listdir(str(tmpdir)) == ['file.json']
+
+
+def test_json_store_persists(tmpdir):
+    path = str(tmpdir.join('store.json'))
+    store = JsonStore(path)
+    store.set('a', {'b': 1})
+    store.set('c', 2)
+    store.delete('c')
+    store.delete('missing')
+
+    assert JsonStore(path).get('a') == {'b': 1}
+    assert JsonStore(path).get('c', 'default') == 'default'
+
+
+def test_json_store_reloads_changes_of_others(tmpdir):
+    path = str(tmpdir.join('store.json'))
+    store, other = JsonStore(path), JsonStore(path)
+    store.set('a', 1)
+    assert other.get('a') == 1
+
+    store.set('a', 2)
+    # The file's modification time may not have changed within its resolution.
+    mtime = os.path.getmtime(path) + 1
+    os.utime(path, (mtime, mtime))
+    assert other.get('a') == 1
+    assert other.reload().get('a') == 2
+
+
+def test_json_store_ignores_a_corrupt_file(tmpdir):
+    path = tmpdir.join('store.json')
+    path.write('{"a": ')
+    store = JsonStore(str(path))
+    assert store.load() == {}
+    store.set('a', 1)
+    assert JsonStore(str(path)).get('a') == 1
+
+
+def test_store_is_shared_per_path(tmpdir):
+    path = str(tmpdir.join('store.json'))
+    assert cache.store(path) is cache.store(path)
+    assert cache.store(path) is not cache.store(str(tmpdir.join('other.json')))
+
+
+def test_library_cache_maps_all_episodes_of_a_show(tmpdir):
+    library = LibraryCache(str(tmpdir.join('library.db')), size=4)
+    library.set_tvshow_db_id(1, 10)
+    library.set_tvshow_episodes(20, [2, 3, 4])
+    assert [library.get_tvshow_db_id(episode) for episode in (1, 2, 3, 4, 5)] == [10, 20, 20, 20, None]
+
+    # The least recently used mapping is evicted.
+    library.get_tvshow_db_id(1)
+    library.set_tvshow_episodes(30, [5])
+    assert library.get_tvshow_db_id(5) == 30
+    assert library.get_tvshow_db_id(1) == 10
+    assert sum(library.get_tvshow_db_id(episode) is not None for episode in (2, 3, 4)) == 2
+
+    library.remove_tvshow(20)
+    assert [library.get_tvshow_db_id(episode) for episode in (2, 3, 4)] == [None, None, None]
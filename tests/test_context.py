@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Tests of the requests to medusa, that don't need a medusa to answer them."""
+
+import pytest
+
+from resources.lib import context
+from resources.lib.pool import spawn
+
+# The requests to medusa are sent with requests, which Kodi provides as the script.module.requests addon.
+pytest.importorskip('requests')
+
+
+class Response(object):
+    """A successful response, with the body given."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def __bool__(self):
+        return True
+    __nonzero__ = __bool__
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        if isinstance(self.body, Exception):
+            raise self.body
+        return self.body
+
+
+@pytest.fixture
+def api():
+    return context.MedusaApi(context.MySettings('http://127.0.0.1:1/', 'medusa', 'medusa', 'false'))
+
+
+def test_authenticate_unreachable(api):
+    # Also through the future the click waits for, which only logs the failure.
+    future = spawn(api._authenticate)
+    assert future.result() is None
+    assert future.error() is None
+    context.wait(future)
+    assert api.api_key == ''
+
+
+@pytest.mark.parametrize('body', [ValueError('No JSON object could be decoded'), {}, {'token': ''}, ['token']])
+def test_authenticate_without_token(api, monkeypatch, body):
+    monkeypatch.setattr(api, '_send', lambda *args, **kwargs: Response(body))
+    assert api._authenticate() is None
+    assert api.api_key == ''
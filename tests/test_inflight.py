@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Tests of the registry of the searches submitted recently."""
+
+import time
+
+import pytest
+import xbmcgui
+
+from resources.lib.inflight import CLOCK_TOLERANCE, InFlight
+
+
+@pytest.fixture
+def registry(window_properties):
+    return InFlight(600)
+
+
+def test_claims_once_per_window(registry):
+    assert registry.claim('tvdb70001', 1, 2) is None
+    assert 0 <= registry.claim('tvdb70001', 1, 2) < 1
+    assert registry.claim('tvdb70001', 1, 3) is None
+    assert registry.claim('tvdb70002', 1, 2) is None
+
+
+def test_release_allows_a_new_claim(registry):
+    registry.claim('tvdb70001', 1, 2)
+    registry.release('tvdb70001', 1, 2)
+    assert registry.claim('tvdb70001', 1, 2) is None
+
+
+def test_claims_expire(registry):
+    xbmcgui.Window().setProperty(InFlight.key('tvdb70001', 1, 2), repr(time.time() - 601))
+    assert registry.claim('tvdb70001', 1, 2) is None
+    assert registry.claim('tvdb70001', 1, 2) is not None
+
+
+def test_claims_slightly_in_the_future(registry):
+    xbmcgui.Window().setProperty(InFlight.key('tvdb70001', 1, 2), repr(time.time() + CLOCK_TOLERANCE / 2.0))
+    assert registry.claim('tvdb70001', 1, 2) == 0
+
+    # Far in the future, like a clock that was set back. Claimed again.
+    xbmcgui.Window().setProperty(InFlight.key('tvdb70001', 1, 2), repr(time.time() + 3600))
+    assert registry.claim('tvdb70001', 1, 2) is None
+
+
+def test_invalid_claims_are_replaced(registry):
+    xbmcgui.Window().setProperty(InFlight.key('tvdb70001', 1, 2), 'garbage')
+    assert registry.claim('tvdb70001', 1, 2) is None
+
+
+def test_disabled(window_properties):
+    registry = InFlight(0)
+    assert registry.claim('tvdb70001', 1, 2) is None
+    assert registry.claim('tvdb70001', 1, 2) is None
+    assert not window_properties
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Tests of the journal of the searches that couldn't be submitted."""
+
+import json
+
+import pytest
+
+from resources.lib import journal
+from resources.lib.journal import RetryJournal
+
+URL = 'http://medusa:8081/'
+SHOW = {'title': 'Show', 'indexer': 'tvdb', 'id': {'tvdb': 70001}}
+
+
+@pytest.fixture
+def retries(tmpdir):
+    return RetryJournal(str(tmpdir.join(journal.JOURNAL_FILE)))
+
+
+def lines(retries):
+    with open(retries.path) as fp:
+        return [json.loads(line) for line in fp]
+
+
+def test_add_only_once(retries):
+    assert retries.add(URL, 'tvdb70001', SHOW, 1, 2)
+    assert not retries.add(URL, 'tvdb70001', SHOW, 1, 2)
+    assert retries.add(URL, 'tvdb70001', SHOW, 1, 3)
+    assert retries.add('http://other:8081/', 'tvdb70001', SHOW, 1, 2)
+
+    assert [(entry['url'], entry['episode']) for entry in retries.pending()] == [
+        (URL, 2), (URL, 3), ('http://other:8081/', 2)
+    ]
+    assert len(lines(retries)) == 3
+
+
+def test_attempted_entries_count_the_attempt(retries):
+    retries.add(URL, 'tvdb70001', SHOW, 1, 2)
+    retries.add(URL, 'tvdb70001', SHOW, 1, 3, attempted=True)
+    assert [entry['attempts'] for entry in retries.pending()] == [0, 1]
+
+
+def test_replays_the_log(retries):
+    retries.add(URL, 'tvdb70001', SHOW, 1, 2)
+    retries.add(URL, 'tvdb70001', SHOW, 1, 3)
+    first, second = retries.pending()
+    assert retries.attempt(first) == 1
+    assert retries.attempt(dict(first, attempts=1)) == 2
+    retries.done(second, 'submitted')
+
+    # A line that was only partially written, when kodi was killed.
+    with open(retries.path, 'a') as fp:
+        fp.write('{"op": "done", "id"')
+
+    pending = RetryJournal(retries.path).pending()
+    assert [(entry['episode'], entry['attempts']) for entry in pending] == [(2, 2)]
+    # A search that's done can be added again.
+    assert retries.add(URL, 'tvdb70001', SHOW, 1, 3)
+
+
+def test_compact_keeps_the_pending_entries(retries, monkeypatch):
+    monkeypatch.setattr(journal, 'COMPACT_LINES', 4)
+    for episode in range(1, 4):
+        retries.add(URL, 'tvdb70001', SHOW, 1, episode)
+    first = retries.pending()[0]
+    retries.attempt(first)
+    retries.done(retries.pending()[1], 'submitted')
+
+    assert not retries.compact()
+    retries.done(first, 'submitted')
+    retries.attempt(retries.pending()[0])
+    pending = retries.pending()
+
+    assert retries.compact()
+    assert len(lines(retries)) == 1
+    assert retries.pending() == pending
+    assert not retries.compact()
+    assert retries.compact(force=True)
+    assert retries.pending() == pending
+
+
+def test_missing_journal_is_empty(retries):
+    assert retries.pending() == []
+    assert retries.compact(force=True)
+    assert retries.pending() == []
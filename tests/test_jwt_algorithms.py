@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Tests of the lazily created algorithms of the vendored jwt."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import jwt
+from jwt import algorithms, api_jws
+from jwt.algorithms import (
+    Algorithm, AlgorithmRegistry, ECAlgorithm, HMACAlgorithm, RSAAlgorithm, RSAPSSAlgorithm, get_default_algorithms
+)
+
+CRYPTOGRAPHY_MODULES = ('cryptography', 'cryptography.hazmat', 'cryptography.hazmat.primitives')
+
+
+@pytest.fixture
+def broken_cryptography(monkeypatch):
+    """Cryptography is found on the path, but fails to import."""
+    for name in CRYPTOGRAPHY_MODULES:
+        monkeypatch.setitem(sys.modules, name, None)
+    monkeypatch.setattr(algorithms, 'has_crypto', True)
+    monkeypatch.setattr(api_jws, 'has_crypto', True)
+
+
+def test_algorithms_are_created_on_lookup():
+    registry = get_default_algorithms()
+    assert not any(isinstance(value, Algorithm) for value in dict.values(registry))
+
+    hs256 = registry['HS256']
+    assert isinstance(hs256, HMACAlgorithm)
+    assert registry['HS256'] is hs256
+    assert not isinstance(dict.__getitem__(registry, 'HS384'), Algorithm)
+
+
+def test_failing_factory_is_a_missing_alg():
+    def factory():
+        raise ImportError('No module named cryptography')
+
+    registry = AlgorithmRegistry({'XX256': factory})
+    with pytest.raises(KeyError):
+        registry['XX256']
+    assert 'XX256' in registry
+
+
+def test_crypto_classes_can_be_imported():
+    # Also without cryptography, like before they were created lazily.
+    for algorithm_class in (RSAAlgorithm, ECAlgorithm, RSAPSSAlgorithm):
+        assert issubclass(algorithm_class, Algorithm)
+
+
+def test_import_does_not_import_cryptography():
+    code = 'import sys, jwt; jwt.encode({}, "secret"); sys.exit("cryptography" in sys.modules)'
+    assert subprocess.call([sys.executable, '-c', code], env={'PYTHONPATH': os.pathsep.join(sys.path)}) == 0
+
+
+@pytest.mark.skipif(algorithms.has_crypto, reason='cryptography is installed')
+def test_missing_cryptography():
+    assert 'RS256' not in get_default_algorithms()
+    with pytest.raises(NotImplementedError) as error:
+        jwt.encode({}, 'secret', algorithm='RS256')
+    assert 'cryptography' in str(error.value)
+
+
+@pytest.mark.usefixtures('broken_cryptography')
+def test_broken_cryptography():
+    pyjwt = jwt.PyJWT()
+    assert 'RS256' in pyjwt.get_algorithms()
+    with pytest.raises(NotImplementedError) as error:
+        pyjwt.encode({}, 'secret', algorithm='RS256')
+    assert 'cryptography' in str(error.value)
+    # The other algorithms still work.
+    assert pyjwt.decode(pyjwt.encode({'a': 1}, 'secret'), 'secret', algorithms=['HS256']) == {'a': 1}
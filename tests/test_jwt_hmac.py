@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Tests of the HMACSigner of the vendored jwt."""
+
+import hashlib
+import hmac
+
+import pytest
+
+import jwt
+from jwt.algorithms import HMACAlgorithm, HMACSigner, get_default_algorithms
+
+MESSAGES = (b'', b'a', b'header.payload', b'x' * 1000)
+
+
+@pytest.mark.parametrize('alg_id,hash_alg', [
+    ('HS256', hashlib.sha256), ('HS384', hashlib.sha384), ('HS512', hashlib.sha512)
+])
+def test_signs_like_hmac_new(alg_id, hash_alg):
+    alg = get_default_algorithms()[alg_id]
+    # Keys longer than the hash's block size are hashed first.
+    for key in ('secret', 'k' * 200):
+        signer = alg.prepare_signing_key(key)
+        assert isinstance(signer, HMACSigner)
+        for message in MESSAGES:
+            expected = hmac.new(key.encode('utf-8'), message, hash_alg).digest()
+            assert signer.sign(message) == expected
+            assert alg.sign(message, signer) == expected
+            assert alg.sign(message, alg.prepare_key(key)) == expected
+            assert alg.verify(message, signer, expected)
+            assert not alg.verify(message, signer, expected[:-1] + b'\0')
+
+
+def test_signer_state_is_not_shared_between_messages():
+    signer = HMACSigner(b'secret', hashlib.sha256)
+    first = signer.sign(b'first')
+    signer.sign(b'second')
+    assert signer.sign(b'first') == first
+
+
+def test_signer_of_another_hash():
+    signer = HMACAlgorithm(hashlib.sha256).prepare_signing_key('secret')
+    expected = hmac.new(b'secret', b'message', hashlib.sha512).digest()
+    assert HMACAlgorithm(hashlib.sha512).sign(b'message', signer) == expected
+
+
+def test_round_trip_with_and_without_the_key_cache():
+    cached, uncached = jwt.PyJWT(), jwt.PyJWT(key_cache_size=0)
+    for alg_id in ('HS256', 'HS384', 'HS512'):
+        token = cached.encode({'a': 1}, 'secret', algorithm=alg_id)
+        assert token == uncached.encode({'a': 1}, 'secret', algorithm=alg_id)
+        assert uncached.decode(token, 'secret', algorithms=[alg_id]) == {'a': 1}
+        assert cached.decode(token, 'secret', algorithms=[alg_id]) == {'a': 1}
+        with pytest.raises(jwt.InvalidSignatureError):
+            cached.decode(token, 'other', algorithms=[alg_id])
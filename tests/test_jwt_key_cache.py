@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Tests of the prepared key cache of the vendored jwt."""
+
+import hashlib
+
+import pytest
+
+import jwt
+from jwt.algorithms import HMACAlgorithm, PreparedKeyCache
+from jwt.exceptions import InvalidKeyError
+
+PAYLOAD = {'apiKey': 'abc'}
+
+
+class CountingHMAC(HMACAlgorithm):
+    """An HMAC algorithm that counts the keys it prepared."""
+
+    def __init__(self):
+        super(CountingHMAC, self).__init__(hashlib.sha256)
+        self.prepared = 0
+
+    def prepare_key(self, key):
+        self.prepared += 1
+        return super(CountingHMAC, self).prepare_key(key)
+
+
+def test_hits_and_misses():
+    cache = PreparedKeyCache(4)
+    alg = CountingHMAC()
+    for _ in range(3):
+        cache.prepare('HS256', alg, 'secret')
+
+    assert alg.prepared == 1
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': 4}
+
+
+def test_keyed_by_alg_and_key():
+    cache = PreparedKeyCache(4)
+    alg = CountingHMAC()
+    cache.prepare('HS256', alg, 'secret')
+    cache.prepare('HS256', alg, b'secret')
+    cache.prepare('HS512', alg, 'secret')
+    cache.prepare('HS256', alg, 'other')
+
+    assert alg.prepared == 3
+    assert cache.stats()['size'] == 3
+
+
+def test_evicts_least_recently_used():
+    cache = PreparedKeyCache(2)
+    alg = CountingHMAC()
+    for key in ('a', 'b', 'a', 'c'):
+        cache.prepare('HS256', alg, key)
+
+    # b was the least recently used when c was added.
+    cache.prepare('HS256', alg, 'a')
+    assert alg.prepared == 3
+    cache.prepare('HS256', alg, 'b')
+    assert alg.prepared == 4
+    assert cache.stats() == {'hits': 2, 'misses': 4, 'evictions': 2, 'size': 2, 'maxsize': 2}
+
+
+def test_invalid_keys_are_not_cached():
+    cache = PreparedKeyCache(4)
+    alg = CountingHMAC()
+    for _ in range(2):
+        with pytest.raises(InvalidKeyError):
+            cache.prepare('HS256', alg, '-----BEGIN PUBLIC KEY-----')
+
+    assert alg.prepared == 2
+    assert cache.stats()['size'] == 0
+
+
+def test_disabled():
+    cache = PreparedKeyCache(0)
+    alg = CountingHMAC()
+    assert cache.prepare('HS256', alg, 'secret') == b'secret'
+    cache.prepare('HS256', alg, 'secret')
+
+    assert alg.prepared == 2
+    assert cache.stats()['size'] == 0
+
+
+def test_clear():
+    cache = PreparedKeyCache(4)
+    cache.prepare('HS256', CountingHMAC(), 'secret')
+    cache.clear()
+
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 4}
+
+
+def test_encode_and_decode_use_the_cache():
+    pyjwt = jwt.PyJWT()
+    token = pyjwt.encode(PAYLOAD, 'secret', algorithm='HS256')
+    assert pyjwt.decode(token, 'secret', algorithms=['HS256']) == PAYLOAD
+
+    stats = pyjwt.get_key_cache_stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_register_algorithm_discards_its_keys():
+    pyjwt = jwt.PyJWT(algorithms=['HS256'])
+    old = CountingHMAC()
+    pyjwt.register_algorithm('XS256', old)
+    token = pyjwt.encode(PAYLOAD, 'secret', algorithm='XS256')
+    pyjwt.encode(PAYLOAD, 'secret', algorithm='HS256')
+
+    pyjwt.unregister_algorithm('XS256')
+    new = CountingHMAC()
+    pyjwt.register_algorithm('XS256', new)
+    assert pyjwt.decode(token, 'secret', algorithms=['XS256']) == PAYLOAD
+
+    assert (old.prepared, new.prepared) == (1, 1)
+    # Only the keys of the replaced algorithm were dropped.
+    assert pyjwt.get_key_cache_stats()['size'] == 2
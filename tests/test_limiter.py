@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Tests of the client-side rate limit of the requests to medusa."""
+
+import threading
+import time
+
+from resources.lib import limiter
+from resources.lib.limiter import BACKGROUND, INTERACTIVE, Scheduler, TokenBucket
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.001)
+
+
+def test_bucket_allows_a_burst():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+    assert 0 < bucket.take() <= 0.1
+
+
+def test_waiting_requests_are_served_by_priority():
+    # No tokens until the requests queued up.
+    scheduler = Scheduler(rate=0.01, burst=1)
+    scheduler.acquire()
+    served = []
+
+    def request(name, priority):
+        scheduler.acquire(priority)
+        served.append(name)
+
+    threads = []
+    for name, priority in (('poll', BACKGROUND), ('batch', BACKGROUND), ('click', INTERACTIVE),
+                           ('replay', BACKGROUND), ('other click', INTERACTIVE)):
+        thread = threading.Thread(target=request, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        # Take the tickets in this order.
+        wait_until(lambda: scheduler.queued() == len(threads))
+
+    scheduler.configure(rate=100, burst=1)
+    for thread in threads:
+        thread.join()
+    assert served == ['click', 'other click', 'poll', 'batch', 'replay']
+
+
+def test_priority_applies_to_the_block():
+    assert limiter.current_priority() == INTERACTIVE
+    with limiter.priority(BACKGROUND):
+        assert limiter.current_priority() == BACKGROUND
+        with limiter.priority(INTERACTIVE):
+            assert limiter.current_priority() == INTERACTIVE
+        assert limiter.current_priority() == BACKGROUND
+    assert limiter.current_priority() == INTERACTIVE
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Tests of the futures and thread pool the addon runs its requests on."""
+
+import threading
+import time
+
+import pytest
+
+from resources.lib.pool import Future, WorkerPool, first, spawn
+
+
+def returns(value, delay=0):
+    def call():
+        time.sleep(delay)
+        return value
+    return call
+
+
+def raises(delay=0):
+    def call():
+        time.sleep(delay)
+        raise ValueError('failed')
+    return call
+
+
+def test_first_returns_the_fastest_accepted_result():
+    futures = [spawn(returns('slow', 0.5)), spawn(returns(None)), spawn(raises()), spawn(returns('fast', 0.05))]
+    start = time.time()
+    assert first(futures) == (3, 'fast')
+    assert time.time() - start < 0.5
+
+
+def test_first_without_accepted_result():
+    assert first([spawn(returns(None)), spawn(raises(0.01)), spawn(returns(0, 0.02))]) == (None, None)
+    assert first([spawn(returns(1)), spawn(returns(2))], accept=lambda value: value == 2) == (1, 2)
+    assert first([]) == (None, None)
+
+
+def test_future_callbacks():
+    future = Future()
+    called = []
+    future.add_done_callback(called.append)
+    assert not called and not future.done()
+    future.set_result('value')
+    future.add_done_callback(called.append)
+    assert called == [future, future]
+    assert future.result() == 'value'
+    assert future.error() is None
+
+
+def test_pool_runs_at_most_workers_calls_at_once():
+    pool = WorkerPool(2)
+    lock = threading.Lock()
+    running = [0]
+    most = [0]
+
+    def work(item):
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return item * 2
+
+    futures = pool.map(work, range(8))
+    assert [future.result() for future in futures] == [item * 2 for item in range(8)]
+    assert most[0] == 2
+    assert len(pool.threads) == 2
+
+
+def test_pool_reuses_idle_threads():
+    pool = WorkerPool(4)
+    for item in range(5):
+        assert pool.submit(returns(item)).result() == item
+        # The worker counts itself idle right after it finished.
+        while not pool.idle:
+            time.sleep(0.001)
+    assert len(pool.threads) == 1
+
+
+def test_pool_reports_errors():
+    pool = WorkerPool(1)
+    future = pool.submit(raises())
+    assert isinstance(future.error(), ValueError)
+    with pytest.raises(ValueError):
+        future.result()
+    assert pool.submit(returns('next')).result() == 'next'